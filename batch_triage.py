@@ -0,0 +1,115 @@
+import argparse
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+from setup_agent.orchestrator import coalesce_stats, triage
+
+
+def report_text(record: dict) -> str:
+    """Bug report text from a JSONL record: `query`, `text`, or `title` + `body`."""
+    if record.get('query') or record.get('text'):
+        return record.get('query') or record.get('text')
+    return "\n\n".join(part for part in (record.get('title'), record.get('body')) if part)
+
+
+def completed_lines(output_path: Path) -> set[int]:
+    """Line numbers that already have a final_output in ``output_path``."""
+    done = set()
+    if not output_path.exists():
+        return done
+    with open(output_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line from an interrupted run
+            if 'final_output' in record:
+                done.add(record['line'])
+    return done
+
+
+def read_reports(stream, skip: set[int]):
+    """(line number, record, error) for each report; a line that is not valid JSON has no record and an error."""
+    for n, line in enumerate(stream, start=1):
+        if n in skip or not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield n, None, f"invalid JSON: {e}"
+            continue
+        yield n, record, None
+
+
+def run_batch(input_path: str, output_path: str, workers: int = 4, resume: bool = True) -> dict:
+    """Triage a JSONL file of reports, appending one result per line as each run finishes.
+
+    At most ``workers`` reports are in flight and the input is read lazily,
+    so memory stays flat for any backlog size. Results are written in
+    completion order and carry their input line number; with ``resume``
+    lines that already have a final_output in the output file are skipped,
+    and failed lines are retried. A line that is not valid JSON gets an
+    error result instead of stopping the batch, and runs already in flight
+    are always written out before returning or raising. Identical reports
+    in flight together share one run; ``coalesced`` counts the ones that did.
+    """
+    out_path = Path(output_path)
+    skip = completed_lines(out_path) if resume else set()
+    stats = {'skipped': len(skip), 'completed': 0, 'failed': 0, 'coalesced': 0}
+    coalesced_before = coalesce_stats()['coalesced']
+    write_lock = threading.Lock()
+
+    def run_one(n: int, record: dict) -> dict:
+        result = {'line': n}
+        if 'request_id' in record:
+            result['request_id'] = record['request_id']
+        try:
+            result['final_output'] = triage(report_text(record))
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+        return result
+
+    source = sys.stdin if input_path == '-' else open(input_path)
+    with source, open(out_path, 'a' if resume else 'w') as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        def write(result):
+            with write_lock:
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+            stats['failed' if 'error' in result else 'completed'] += 1
+
+        def flush(done):
+            for future in done:
+                write(future.result())
+
+        in_flight = set()
+        try:
+            for n, record, error in read_reports(source, skip):
+                if error is not None:
+                    write({'line': n, 'error': error})
+                    continue
+                if len(in_flight) >= workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    flush(done)
+                in_flight.add(pool.submit(run_one, n, record))
+        finally:
+            # Finished work is never thrown away, even if reading the input fails part way
+            flush(wait(in_flight).done)
+
+    stats['coalesced'] = coalesce_stats()['coalesced'] - coalesced_before
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Triage a JSONL backlog of bug reports')
+    parser.add_argument('input', help="JSONL with one report per line ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='triage_results.jsonl', help='JSONL file to append results to')
+    parser.add_argument('--workers', type=int, default=4, help='reports triaged concurrently')
+    parser.add_argument('--no-resume', action='store_true', help='start over instead of skipping completed lines')
+    args = parser.parse_args()
+
+    stats = run_batch(args.input, args.output, workers=args.workers, resume=not args.no_resume)
+    print(f"Completed {stats['completed']} ({stats['coalesced']} shared an identical run), failed {stats['failed']}, "
+          f"skipped {stats['skipped']} already done", file=sys.stderr)
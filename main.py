@@ -1,8 +1,13 @@
+import argparse
 from setup_environment.env_setup import setup_environment
 from setup_seed_data.seed_data import seed_data
 from stage_1_golden_sets.golden_set import run_golden_set
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Seed fixtures and run the golden set')
+    parser.add_argument('--workers', type=int, default=1, help='number of golden set cases to run concurrently')
+    args = parser.parse_args()
+
     setup_environment()
     seed_data()
-    run_golden_set()
\ No newline at end of file
+    run_golden_set(workers=args.workers)
\ No newline at end of file
@@ -0,0 +1,119 @@
+import sys
+from collections import deque
+from typing import Iterable, Iterator
+
+# Category -> phrases that trigger it. A phrase matches anywhere in the
+# lower-cased report, substrings included ('prod' matches 'production').
+CLASSIFIER_RULES: dict[str, list[str]] = {
+    'off_topic': ['explain', 'how to', 'what is', 'quantum', 'mechanics',
+                  'random thought', 'life', 'feature request'],
+    'trivial': ['typo in footer', 'typo in'],
+    'critical': ['crashed completely', 'database crashed', 'production database crashed',
+                 'complete outage', 'all users', 'complete production', 'affecting all'],
+    'high': ['error', 'failure', 'broken', 'not working',
+             'timeout', 'failing', 'leak', 'memory leak', 'api crash'],
+    'database': ['database'],
+    'prod': ['prod'],
+    'login': ['login'],
+    'minor_ui': ['ui glitch', 'dashboard glitch', 'minor'],
+    'design': ["doesn't match design", 'button color'],
+    'ambiguous': ['bug or feature', 'is this a bug', 'feature request'],
+}
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over every phrase in a rules table.
+
+    ``match`` walks the text once and returns every category with at least
+    one phrase occurring in it, however many phrases the table holds.
+    """
+
+    def __init__(self, rules: dict[str, Iterable[str]]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[frozenset[str]] = [frozenset()]
+
+        for category, phrases in rules.items():
+            for phrase in phrases:
+                node = 0
+                for ch in phrase.lower():
+                    nxt = self._goto[node].get(ch)
+                    if nxt is None:
+                        nxt = len(self._goto)
+                        self._goto[node][ch] = nxt
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._out.append(frozenset())
+                    node = nxt
+                self._out[node] = self._out[node] | {category}
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] | self._out[self._fail[nxt]]
+
+    def match(self, text: str) -> set[str]:
+        found: set[str] = set()
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for ch in text.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found |= out[node]
+        return found
+
+
+def compile_rules(rules: dict[str, Iterable[str]] = None) -> KeywordMatcher:
+    return KeywordMatcher(rules or CLASSIFIER_RULES)
+
+
+def classify_categories(categories: set[str]) -> tuple[bool, str]:
+    """Map matched categories to (is_valid_bug, severity), in priority order."""
+    if 'off_topic' in categories:
+        return False, 'not_a_bug'
+
+    is_critical = 'critical' in categories
+    is_high = 'high' in categories or ('prod' in categories and ('database' in categories or 'login' in categories))
+
+    if 'trivial' in categories:
+        return True, 'trivial'
+    if is_critical:
+        return True, 'critical'
+    if is_high:
+        return True, 'high'
+    if 'minor_ui' in categories:
+        return True, 'minor'
+    if 'design' in categories or 'ambiguous' in categories:
+        return True, 'needs_investigation'
+    return True, 'medium'
+
+
+_default_matcher = None
+
+
+def classify_texts(texts: Iterable[str], matcher: KeywordMatcher = None) -> Iterator[tuple[bool, str]]:
+    """Pre-classify a stream of reports without touching the LLM."""
+    global _default_matcher
+    if matcher is None:
+        if _default_matcher is None:
+            _default_matcher = compile_rules()
+        matcher = _default_matcher
+    for text in texts:
+        yield classify_categories(matcher.match(text))
+
+
+if __name__ == '__main__':
+    # One report per line on stdin -> "severity<TAB>report" on stdout
+    matcher = compile_rules()
+    for line in sys.stdin:
+        report = line.rstrip('\n')
+        _, severity = classify_categories(matcher.match(report))
+        print(f"{severity}\t{report}")
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Hashable
+
+from setup_agent.search_index import TOKEN_RE
+
+
+class _Abandoned(Exception):
+    """The leading call was cancelled or interrupted; a waiting caller should run it itself."""
+
+
+def normalize_query(text: str) -> str:
+    """Case, punctuation and spacing folded away, so trivially different copies of a report share a key."""
+    return " ".join(TOKEN_RE.findall(text.lower()))
+
+
+def coalescing_enabled() -> bool:
+    """False when COALESCE=off."""
+    return os.getenv("COALESCE", "on") != "off"
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs the work; callers that
+    arrive while it is in flight wait and receive the same result, or the
+    same exception. Once the leader finishes the key is forgotten, so later
+    calls run afresh. Threads use ``do`` and coroutines ``ado``, and the two
+    share flights. If a leader is cancelled its followers do not inherit the
+    cancellation: one of them takes over and runs the work instead.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "coalesced": 0}
+
+    def _join(self, key: Hashable) -> tuple[Future, bool]:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = Future()
+                self._stats["leaders"] += 1
+                return flight, True
+            self._stats["coalesced"] += 1
+            return flight, False
+
+    def _land(self, key: Hashable, flight: Future, result: Any = None, error: BaseException | None = None) -> None:
+        with self._lock:
+            self._flights.pop(key, None)
+        if error is None:
+            flight.set_result(result)
+        else:
+            flight.set_exception(error if isinstance(error, Exception) else _Abandoned())
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        while True:
+            flight, leader = self._join(key)
+            if not leader:
+                try:
+                    return flight.result()
+                except _Abandoned:
+                    continue
+            try:
+                result = fn()
+            except BaseException as e:
+                self._land(key, flight, error=e)
+                raise
+            self._land(key, flight, result)
+            return result
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            flight, leader = self._join(key)
+            if not leader:
+                try:
+                    # Shielded so a follower giving up never cancels the shared flight
+                    return await asyncio.shield(asyncio.wrap_future(flight))
+                except _Abandoned:
+                    continue
+            try:
+                result = await fn()
+            except BaseException as e:
+                self._land(key, flight, error=e)
+                raise
+            self._land(key, flight, result)
+            return result
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._flights)}
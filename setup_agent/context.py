@@ -0,0 +1,91 @@
+import json
+import os
+from typing import Sequence
+
+from langchain_core.messages import BaseMessage
+
+# Rough size of a token in English text; close enough for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 6000
+DEFAULT_MAX_TOOL_CHARS = 4000
+# Tool results are never cut below this when squeezing into the budget
+MIN_TOOL_CHARS = 300
+
+
+def message_chars(m: BaseMessage) -> int:
+    content = m.content if isinstance(m.content, str) else json.dumps(m.content)
+    tool_calls = getattr(m, "tool_calls", None)
+    return len(content) + (len(json.dumps([tc["args"] for tc in tool_calls])) if tool_calls else 0)
+
+
+def estimate_tokens(messages: Sequence[BaseMessage]) -> int:
+    return sum(message_chars(m) for m in messages) // CHARS_PER_TOKEN
+
+
+def truncate(text: str, limit: int) -> str:
+    """Cut ``text`` to about ``limit`` characters, preferring a result boundary, and say how much was dropped."""
+    if len(text) <= limit:
+        return text
+    cut = text.rfind("\n\n", 0, limit)
+    if cut < limit // 2:
+        cut = limit
+    return f"{text[:cut]}\n[... {len(text) - cut} more characters truncated]"
+
+
+def compact_messages(messages: Sequence[BaseMessage], budget: int = DEFAULT_TOKEN_BUDGET,
+                     max_tool_chars: int = DEFAULT_MAX_TOOL_CHARS) -> tuple[list[BaseMessage], dict[str, int]]:
+    """Shrink a conversation towards ``budget`` tokens before it is sent to the model.
+
+    The first three steps always run, whatever the budget:
+      - instruction SystemMessages after the leading system prompt are
+        dropped except the most recent, which supersedes the others
+      - a tool result identical to an earlier one from the same tool is
+        replaced by a back-reference
+      - tool results longer than ``max_tool_chars`` are truncated
+    Only if the estimate is then still over budget are tool results cut
+    down to MIN_TOOL_CHARS, oldest first, until it fits.
+
+    Human and AI messages are never touched and every ToolMessage is kept,
+    so tool calls stay paired with their results. The input is not
+    modified. Returns the compacted list and token counts before and after.
+    """
+    before = estimate_tokens(messages)
+
+    leading = 0
+    while leading < len(messages) and messages[leading].type == "system":
+        leading += 1
+    instructions = [i for i in range(leading, len(messages)) if messages[i].type == "system"]
+    superseded = set(instructions[:-1])
+
+    seen_results = set()
+    compacted = []
+    for i, m in enumerate(messages):
+        if i in superseded:
+            continue
+        if m.type == "tool" and isinstance(m.content, str):
+            key = (m.name, m.content)
+            if key in seen_results:
+                m = m.model_copy(update={"content": f"[Same result as the earlier {m.name} call above]"})
+            else:
+                seen_results.add(key)
+                if len(m.content) > max_tool_chars:
+                    m = m.model_copy(update={"content": truncate(m.content, max_tool_chars)})
+        compacted.append(m)
+
+    total = sum(message_chars(m) for m in compacted)
+    for i, m in enumerate(compacted):
+        if total <= budget * CHARS_PER_TOKEN:
+            break
+        if m.type == "tool" and isinstance(m.content, str) and len(m.content) > MIN_TOOL_CHARS:
+            shorter = m.model_copy(update={"content": truncate(m.content, MIN_TOOL_CHARS)})
+            total -= message_chars(m) - message_chars(shorter)
+            compacted[i] = shorter
+
+    return compacted, {"tokens_before": before, "tokens_after": total // CHARS_PER_TOKEN}
+
+
+def context_budget() -> int | None:
+    """Token budget from CONTEXT_TOKEN_BUDGET (default DEFAULT_TOKEN_BUDGET), or None when CONTEXT_COMPACTION=off."""
+    if os.getenv("CONTEXT_COMPACTION", "on") == "off":
+        return None
+    return int(os.getenv("CONTEXT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
@@ -0,0 +1,51 @@
+import os
+from typing import Any
+
+from setup_agent.search_index import InvertedIndex, tokenize
+
+# Weighted Jaccard between a report and a ticket summary above which we skip the LLM
+DUPLICATE_THRESHOLD = 0.75
+# BM25 neighbours of the report that are checked for similarity
+DEDUPE_CANDIDATES = 10
+
+
+def similarity(weights: dict[str, float], a: set[str], b: set[str]) -> float:
+    """IDF-weighted Jaccard of two token sets: shared rare words count for much more than shared common ones.
+
+    ``weights`` maps every term of ``a`` and ``b`` to its idf (see InvertedIndex.idfs).
+    """
+    union = a | b
+    if not union:
+        return 0.0
+    total = sum(weights[t] for t in union)
+    return sum(weights[t] for t in a & b) / total if total else 0.0
+
+
+def find_duplicate(report: str, index: InvertedIndex, threshold: float = DUPLICATE_THRESHOLD,
+                   candidates: int = DEDUPE_CANDIDATES) -> tuple[dict[str, Any], float] | None:
+    """Existing ticket whose summary is a near-duplicate of ``report``, with its similarity.
+
+    The Jira inverted index serves as the approximate neighbour structure:
+    its top BM25 hits are the only tickets compared, so the cost does not
+    grow with the corpus, and tickets from jira_create are matched as soon
+    as the journal has indexed them.
+    """
+    report_terms = set(tokenize(report))
+    if not report_terms:
+        return None
+    hits = [(ticket, set(tokenize(ticket.get("summary", "")))) for ticket, _ in index.search(report, k=candidates)]
+    # One idf lookup for every term involved, rather than one per term per candidate
+    weights = index.idfs(report_terms.union(*(terms for _, terms in hits)))
+    best = None
+    for ticket, terms in hits:
+        score = similarity(weights, report_terms, terms)
+        if score >= threshold and (best is None or score > best[1]):
+            best = (ticket, score)
+    return best
+
+
+def dedupe_threshold() -> float | None:
+    """Threshold from DEDUPE_THRESHOLD (default DUPLICATE_THRESHOLD), or None when DEDUPE=off."""
+    if os.getenv("DEDUPE", "on") == "off":
+        return None
+    return float(os.getenv("DEDUPE_THRESHOLD", DUPLICATE_THRESHOLD))
@@ -0,0 +1,97 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+
+class FixtureStore:
+    """Process-wide cache of parsed JSON fixtures.
+
+    Each file is parsed once and served from memory until its mtime or size
+    changes on disk. Parsed objects are shared between callers, so treat them
+    as read-only and hand replacements back through ``put``.
+    """
+
+    def __init__(self):
+        self._entries: dict[Path, tuple[tuple[int, int], Any]] = {}
+        self._path_locks: dict[Path, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "loads": 0, "reloads": 0, "missing": 0, "parse_seconds": 0.0}
+
+    @staticmethod
+    def _signature(path: Path) -> tuple[int, int] | None:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _path_lock(self, path: Path) -> threading.Lock:
+        with self._lock:
+            return self._path_locks.setdefault(path, threading.Lock())
+
+    def get(self, path: Path, default: Callable[[], Any] = dict) -> Any:
+        path = Path(path)
+        sig = self._signature(path)
+        if sig is None:
+            with self._lock:
+                self._stats["missing"] += 1
+            return default()
+
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == sig:
+            with self._lock:
+                self._stats["hits"] += 1
+            return entry[1]
+
+        # One parse per path at a time; concurrent callers wait and reuse it.
+        with self._path_lock(path):
+            entry = self._entries.get(path)
+            sig = self._signature(path)
+            if sig is None:
+                return default()
+            if entry is not None and entry[0] == sig:
+                with self._lock:
+                    self._stats["hits"] += 1
+                return entry[1]
+
+            start = time.perf_counter()
+            with open(path) as f:
+                data = json.load(f)
+            elapsed = time.perf_counter() - start
+
+            self._entries[path] = (sig, data)
+            with self._lock:
+                self._stats["reloads" if entry is not None else "loads"] += 1
+                self._stats["parse_seconds"] += elapsed
+            return data
+
+    def put(self, path: Path, data: Any) -> None:
+        """Record ``data`` as the parsed form of ``path`` after the caller has written it."""
+        path = Path(path)
+        sig = self._signature(path)
+        if sig is not None:
+            self._entries[path] = (sig, data)
+
+    def version(self, path: Path) -> tuple[int, int] | None:
+        """Signature of the currently cached parse of ``path``, or None if not cached."""
+        entry = self._entries.get(Path(path))
+        return entry[0] if entry else None
+
+    def invalidate(self, path: Path | None = None) -> None:
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(Path(path), None)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["cached_files"] = len(self._entries)
+        return stats
+
+
+fixture_store = FixtureStore()
@@ -0,0 +1,248 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable
+
+# Timings recorded while the current node runs; tools and LLM calls add to it
+_collector: ContextVar[dict | None] = ContextVar("metrics_collector", default=None)
+
+EXPORT_FORMATS = ("jsonl", "prometheus")
+
+
+def new_metrics() -> dict[str, Any]:
+    return {"started": None, "nodes": {}, "tools": {}, "llm": {}, "context": {}}
+
+
+def merge_metrics(left: dict | None, right: dict | None) -> dict:
+    """State reducer: sum per-node, per-tool and LLM counters; keep the earliest start time."""
+    merged = new_metrics()
+    for part in (left, right):
+        if not part:
+            continue
+        if part.get("started") is not None:
+            merged["started"] = part["started"] if merged["started"] is None else min(merged["started"], part["started"])
+        for group in ("nodes", "tools"):
+            for name, (calls, seconds) in part.get(group, {}).items():
+                prev_calls, prev_seconds = merged[group].get(name, (0, 0.0))
+                merged[group][name] = (prev_calls + calls, prev_seconds + seconds)
+        for group in ("llm", "context"):
+            for key, value in part.get(group, {}).items():
+                merged[group][key] = merged[group].get(key, 0) + value
+    return merged
+
+
+def _add(group: dict, name: str, seconds: float) -> None:
+    calls, total = group.get(name, (0, 0.0))
+    group[name] = (calls + 1, total + seconds)
+
+
+def timed_node(name: str, node: Callable, anode: Callable | None = None):
+    """Wrap a graph node so its run time, and any tool or LLM time inside it, lands in ``state['metrics']``.
+
+    ``node`` is either a plain node function or a runnable such as ToolNode.
+    Whatever the node returns is passed through with a ``metrics`` delta
+    added for the merge_metrics reducer. The result runs under both
+    ``invoke`` and ``ainvoke``: the async path awaits ``anode`` (or the
+    runnable's ``ainvoke``) and otherwise calls ``node`` inline.
+    """
+    from langchain_core.runnables import RunnableLambda
+
+    def start():
+        metrics = new_metrics()
+        metrics["started"] = time.time()
+        return metrics, _collector.set(metrics), time.perf_counter()
+
+    def finish(metrics, started, result):
+        _add(metrics["nodes"], name, time.perf_counter() - started)
+        if result is None:
+            result = {}
+        result["metrics"] = metrics
+        return result
+
+    def run(state, config):
+        metrics, token, started = start()
+        try:
+            if hasattr(node, "invoke"):
+                result = node.invoke(state, config)
+            else:
+                result = node(state)
+        finally:
+            _collector.reset(token)
+        return finish(metrics, started, result)
+
+    async def arun(state, config):
+        metrics, token, started = start()
+        try:
+            if anode is not None:
+                result = await anode(state)
+            elif hasattr(node, "ainvoke"):
+                result = await node.ainvoke(state, config)
+            else:
+                result = node(state)
+        finally:
+            _collector.reset(token)
+        return finish(metrics, started, result)
+
+    run.__name__ = name
+    return RunnableLambda(run, afunc=arun, name=name)
+
+
+def timed_tool(fn: Callable) -> Callable:
+    """Record each call's duration against the running node; apply beneath ``@tool``."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        metrics = _collector.get()
+        if metrics is None:
+            return fn(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _add(metrics["tools"], fn.__name__, time.perf_counter() - started)
+    return wrapper
+
+
+def record_llm_call(message, seconds: float, cached: bool = False) -> None:
+    """Count one model call and the token usage reported on its response."""
+    metrics = _collector.get()
+    if metrics is None:
+        return
+    usage = getattr(message, "usage_metadata", None) or {}
+    llm = metrics["llm"]
+    llm["calls"] = llm.get("calls", 0) + 1
+    llm["seconds"] = llm.get("seconds", 0.0) + seconds
+    if cached:
+        # Served from the response cache: no tokens were spent on this call
+        llm["cached_calls"] = llm.get("cached_calls", 0) + 1
+        return
+    llm["prompt_tokens"] = llm.get("prompt_tokens", 0) + usage.get("input_tokens", 0)
+    llm["completion_tokens"] = llm.get("completion_tokens", 0) + usage.get("output_tokens", 0)
+
+
+def record_compaction(tokens_before: int, tokens_after: int) -> None:
+    """Count one context compaction ahead of a model call."""
+    metrics = _collector.get()
+    if metrics is None:
+        return
+    context = metrics["context"]
+    context["compactions"] = context.get("compactions", 0) + 1
+    context["tokens_before"] = context.get("tokens_before", 0) + tokens_before
+    context["tokens_after"] = context.get("tokens_after", 0) + tokens_after
+
+
+def metrics_breakdown(metrics: dict | None) -> dict[str, Any]:
+    """The ``final_output['metrics']`` view: milliseconds per node, tool and LLM, token counts and context compaction."""
+    metrics = metrics or new_metrics()
+    ms = lambda seconds: round(seconds * 1000, 3)
+    llm = metrics.get("llm", {})
+    prompt, completion = llm.get("prompt_tokens", 0), llm.get("completion_tokens", 0)
+    context = metrics.get("context", {})
+    context_before = context.get("tokens_before", 0)
+    started = metrics.get("started")
+    return {
+        "total_ms": ms(time.time() - started) if started else 0.0,
+        "nodes": {name: {"calls": calls, "ms": ms(seconds)} for name, (calls, seconds) in metrics.get("nodes", {}).items()},
+        "tools": {name: {"calls": calls, "ms": ms(seconds)} for name, (calls, seconds) in metrics.get("tools", {}).items()},
+        "llm": {
+            "calls": llm.get("calls", 0),
+            "cached_calls": llm.get("cached_calls", 0),
+            "ms": ms(llm.get("seconds", 0.0)),
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "total_tokens": prompt + completion,
+        },
+        "context": {
+            "compactions": context.get("compactions", 0),
+            "tokens_before": context_before,
+            "tokens_after": context.get("tokens_after", 0),
+            "ratio": round(context.get("tokens_after", 0) / context_before, 3) if context_before else 1.0,
+        },
+    }
+
+
+class MetricsExporter:
+    """Writes per-run breakdowns to a local file.
+
+    ``jsonl`` appends one line per run. ``prometheus`` keeps running totals
+    labelled by node, tool and severity, and rewrites the file in text
+    exposition format after every run, so a node_exporter textfile
+    collector (or a plain ``cat``) can pick it up.
+    """
+
+    def __init__(self, path: Path, fmt: str = "jsonl"):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown metrics format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+        self.path = Path(path)
+        self.format = fmt
+        self._lock = threading.Lock()
+        self._totals: dict[tuple[str, tuple], float] = {}
+
+    def export(self, output: dict[str, Any], severity: str | None) -> None:
+        breakdown = output.get("metrics", {})
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.format == "jsonl":
+                record = {"ts": round(time.time(), 3), "severity": severity, "status": output.get("status"),
+                          "action_taken": output.get("action_taken"), **breakdown}
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+                return
+            self._accumulate(breakdown, severity or "unknown")
+            self._write_prometheus()
+
+    def _inc(self, metric: str, labels: dict[str, str], value: float) -> None:
+        key = (metric, tuple(sorted(labels.items())))
+        self._totals[key] = self._totals.get(key, 0) + value
+
+    def _accumulate(self, breakdown: dict, severity: str) -> None:
+        self._inc("triage_runs_total", {"severity": severity}, 1)
+        self._inc("triage_run_seconds_total", {"severity": severity}, breakdown.get("total_ms", 0) / 1000)
+        for name, stats in breakdown.get("nodes", {}).items():
+            self._inc("triage_node_calls_total", {"node": name}, stats["calls"])
+            self._inc("triage_node_seconds_total", {"node": name}, stats["ms"] / 1000)
+        for name, stats in breakdown.get("tools", {}).items():
+            self._inc("triage_tool_calls_total", {"tool": name}, stats["calls"])
+            self._inc("triage_tool_seconds_total", {"tool": name}, stats["ms"] / 1000)
+        llm = breakdown.get("llm", {})
+        self._inc("triage_llm_calls_total", {"severity": severity}, llm.get("calls", 0))
+        self._inc("triage_llm_cached_calls_total", {"severity": severity}, llm.get("cached_calls", 0))
+        self._inc("triage_llm_seconds_total", {"severity": severity}, llm.get("ms", 0) / 1000)
+        self._inc("triage_llm_tokens_total", {"severity": severity, "kind": "prompt"}, llm.get("prompt_tokens", 0))
+        self._inc("triage_llm_tokens_total", {"severity": severity, "kind": "completion"}, llm.get("completion_tokens", 0))
+        context = breakdown.get("context", {})
+        self._inc("triage_context_tokens_total", {"stage": "before"}, context.get("tokens_before", 0))
+        self._inc("triage_context_tokens_total", {"stage": "after"}, context.get("tokens_after", 0))
+
+    def _write_prometheus(self) -> None:
+        lines = []
+        for metric in sorted({m for m, _ in self._totals}):
+            lines.append(f"# TYPE {metric} counter")
+            for (name, labels), value in sorted(self._totals.items()):
+                if name == metric:
+                    label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                    lines.append(f"{metric}{{{label_text}}} {value:g}")
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, self.path)
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> MetricsExporter | None:
+    """Exporter configured by METRICS_FILE (and METRICS_FORMAT, default jsonl); None when unset."""
+    global _exporter
+    path = os.getenv("METRICS_FILE")
+    if not path:
+        return None
+    fmt = os.getenv("METRICS_FORMAT", "jsonl")
+    with _exporter_lock:
+        if _exporter is None or _exporter.path != Path(path) or _exporter.format != fmt:
+            _exporter = MetricsExporter(Path(path), fmt)
+        return _exporter
@@ -0,0 +1,258 @@
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable
+
+from setup_agent.fixture_store import fixture_store
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+JOURNAL_COMPACT_EVERY = 500
+
+KEY_RE = re.compile(r"^([A-Z]+)-(\d+)$")
+
+
+class JiraJournal:
+    """Append-only write path for Jira tickets.
+
+    New tickets are appended as JSON lines to ``<snapshot>.journal.jsonl``
+    instead of rewriting the snapshot. Ticket IDs come from a counter that is
+    advanced under an exclusive lock after replaying any records other
+    writers appended, so concurrent creators (threads or processes) never
+    hand out the same key. Appends are made durable with group commit: one
+    fsync covers every record written while the previous fsync was running.
+    Once the journal holds ``compact_every`` records it is folded back into
+    the snapshot in the background.
+
+    Compaction replaces the snapshot before truncating the journal, so a
+    crash in between leaves records that are already in the snapshot;
+    replay skips any record whose key the snapshot holds.
+
+    Subscribers get ``on_reset(tickets)`` whenever the full ticket list has to
+    be rebuilt (first load, snapshot replaced on disk) and ``on_ticket(ticket)``
+    for every ticket applied from the journal after that.
+    """
+
+    def __init__(self, snapshot_path: Path, prefix: str = "CSE", compact_every: int = JOURNAL_COMPACT_EVERY, durable: bool = True):
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = self.snapshot_path.with_suffix(".journal.jsonl")
+        self.lock_path = self.snapshot_path.with_suffix(".lock")
+        self.prefix = prefix
+        self.compact_every = compact_every
+        self.durable = durable
+
+        self._lock = threading.RLock()
+        self._snapshot_version = None
+        self._snapshot: list[dict[str, Any]] = []
+        self._snapshot_keys: set[str] = set()
+        self._journal: dict[str, dict[str, Any]] = {}
+        self._offset = 0
+        self._next_id = 1
+        self._fh = None
+        self._lock_fh = None
+        self._listeners: list[tuple[Callable, Callable]] = []
+
+        self._sync_cond = threading.Condition()
+        self._written_seq = 0
+        self._synced_seq = 0
+        self._syncing = False
+        self._fsyncs = 0
+        self._compacting = False
+
+    @contextmanager
+    def _file_lock(self, shared: bool = False):
+        if fcntl is None:
+            yield
+            return
+        if self._lock_fh is None:
+            self._lock_fh = open(self.lock_path, "a")
+        fcntl.flock(self._lock_fh, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fh, fcntl.LOCK_UN)
+
+    def _track_id(self, key: str) -> None:
+        m = KEY_RE.match(key or "")
+        if m and m.group(1) == self.prefix:
+            self._next_id = max(self._next_id, int(m.group(2)) + 1)
+
+    def _tickets(self) -> list[dict[str, Any]]:
+        return self._snapshot + list(self._journal.values())
+
+    def _refresh(self) -> None:
+        data = fixture_store.get(self.snapshot_path, lambda: {"tickets": []})
+        version = fixture_store.version(self.snapshot_path)
+        size = self.journal_path.stat().st_size if self.journal_path.exists() else 0
+        if version != self._snapshot_version or size < self._offset:
+            self._snapshot_version = version
+            self._snapshot = data.get("tickets", [])
+            self._snapshot_keys = {t.get("key") for t in self._snapshot}
+            self._journal = {}
+            self._offset = 0
+            self._next_id = 1
+            for t in self._snapshot:
+                self._track_id(t.get("key"))
+            self._replay(size, notify=False)
+            for on_reset, _ in self._listeners:
+                on_reset(self._tickets())
+        else:
+            self._replay(size, notify=True)
+
+    def _replay(self, size: int, notify: bool) -> None:
+        if size <= self._offset:
+            return
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        # Only consume complete lines; a torn trailing write is picked up next time.
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            ticket = json.loads(line)
+            if ticket["key"] in self._snapshot_keys:
+                continue  # already folded into the snapshot by a compaction that died before truncating
+            self._journal[ticket["key"]] = ticket
+            self._track_id(ticket["key"])
+            if notify:
+                for _, on_ticket in self._listeners:
+                    on_ticket(ticket)
+        self._offset += end
+
+    def refresh(self) -> None:
+        """Pick up a replaced snapshot or records appended by other writers."""
+        with self._lock, self._file_lock(shared=True):
+            self._refresh()
+
+    def subscribe(self, on_reset: Callable[[list], None], on_ticket: Callable[[dict], None]) -> None:
+        with self._lock, self._file_lock(shared=True):
+            self._listeners.append((on_reset, on_ticket))
+            if self._snapshot_version is None:
+                self._refresh()
+            else:
+                on_reset(self._tickets())
+
+    def tickets(self) -> list[dict[str, Any]]:
+        with self._lock, self._file_lock(shared=True):
+            self._refresh()
+            return self._tickets()
+
+    def create(self, fields: dict[str, Any]) -> dict[str, Any]:
+        """Allocate the next key, append the ticket to the journal and return it."""
+        with self._lock:
+            with self._file_lock():
+                self._refresh()
+                key = f"{self.prefix}-{self._next_id}"
+                self._next_id += 1
+                ticket = {"key": key, **fields}
+                line = (json.dumps(ticket) + "\n").encode()
+                if self._fh is None:
+                    self._fh = open(self.journal_path, "ab")
+                self._fh.write(line)
+                self._fh.flush()
+                self._offset += len(line)
+                self._journal[key] = ticket
+                for _, on_ticket in self._listeners:
+                    on_ticket(ticket)
+            with self._sync_cond:
+                self._written_seq += 1
+                seq = self._written_seq
+            compact = len(self._journal) >= self.compact_every and not self._compacting
+            if compact:
+                self._compacting = True
+
+        if self.durable:
+            self._wait_durable(seq)
+        if compact:
+            threading.Thread(target=self._background_compact, daemon=True).start()
+        return ticket
+
+    def append(self, ticket: dict[str, Any]) -> None:
+        """Journal a ticket whose key was allocated elsewhere, e.g. by the SQLite store.
+
+        Only the journal file is touched; the snapshot is not loaded and this
+        instance's view is not updated. Readers pick the record up on their
+        next refresh.
+        """
+        line = (json.dumps(ticket) + "\n").encode()
+        with self._lock, self._file_lock():
+            with open(self.journal_path, "ab") as f:
+                f.write(line)
+                f.flush()
+                if self.durable:
+                    os.fsync(f.fileno())
+
+    def _wait_durable(self, seq: int) -> None:
+        with self._sync_cond:
+            while self._synced_seq < seq:
+                if self._syncing:
+                    self._sync_cond.wait()
+                    continue
+                # Become the leader: one fsync covers everything written so far.
+                self._syncing = True
+                target = self._written_seq
+                self._sync_cond.release()
+                try:
+                    os.fsync(self._fh.fileno())
+                finally:
+                    self._sync_cond.acquire()
+                    self._syncing = False
+                    self._fsyncs += 1
+                    self._synced_seq = max(self._synced_seq, target)
+                    self._sync_cond.notify_all()
+
+    def _background_compact(self) -> None:
+        try:
+            self.compact()
+        finally:
+            self._compacting = False
+
+    def compact(self) -> None:
+        """Fold journaled tickets into the snapshot file and truncate the journal."""
+        with self._lock, self._file_lock():
+            self._refresh()
+            if not self._journal and not self._offset:
+                return
+            data = {**fixture_store.get(self.snapshot_path, dict), "tickets": self._tickets()}
+            tmp = self.snapshot_path.with_suffix(".json.tmp")
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+            fixture_store.put(self.snapshot_path, data)
+
+            if self._fh is not None:
+                self._fh.flush()
+                os.ftruncate(self._fh.fileno(), 0)
+            else:
+                open(self.journal_path, "wb").close()
+            self._snapshot_version = fixture_store.version(self.snapshot_path)
+            self._snapshot = data["tickets"]
+            self._snapshot_keys = {t.get("key") for t in self._snapshot}
+            self._journal = {}
+            self._offset = 0
+
+    def close(self) -> None:
+        with self._lock:
+            for fh in (self._fh, self._lock_fh):
+                if fh is not None:
+                    fh.close()
+            self._fh = self._lock_fh = None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "snapshot_tickets": len(self._snapshot),
+                "journal_tickets": len(self._journal),
+                "next_id": self._next_id,
+                "appends": self._written_seq,
+                "fsyncs": self._fsyncs,
+            }
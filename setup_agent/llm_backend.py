@@ -0,0 +1,389 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field, PrivateAttr
+
+DEFAULT_CASSETTE_DIR = Path(__file__).parent.parent / "setup_seed_data" / "llm_cassettes"
+
+BACKENDS = ("live", "record", "replay", "stub")
+
+STUB_PRIORITIES = {"critical": "P0", "high": "P1", "medium": "P2", "minor": "P3", "needs_investigation": "P2"}
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when no recorded response matches a request."""
+
+
+def normalize_messages(messages: Sequence[BaseMessage]) -> list[dict[str, Any]]:
+    """Reduce messages to the fields that determine a completion.
+
+    Message ids are dropped and tool-call ids are renumbered in order of
+    appearance, so the same conversation normalizes identically whichever
+    run (or provider) generated the ids.
+    """
+    call_ids: dict[str, str] = {}
+    normalized = []
+    for m in messages:
+        record: dict[str, Any] = {"type": m.type, "content": m.content}
+        tool_calls = getattr(m, "tool_calls", None)
+        if tool_calls:
+            record["tool_calls"] = [
+                {"name": tc["name"], "args": tc["args"], "id": call_ids.setdefault(tc["id"], f"call_{len(call_ids)}")}
+                for tc in tool_calls
+            ]
+        if m.type == "tool":
+            record["tool_call_id"] = call_ids.get(m.tool_call_id, m.tool_call_id)
+        normalized.append(record)
+    return normalized
+
+
+def request_key(model: str, temperature: float, tools: Sequence[Any], messages: Sequence[BaseMessage], scope: Any = None) -> str:
+    """Stable hash of everything that determines a chat completion.
+
+    ``scope`` adds whatever else the answer depends on, such as the backend
+    and chat model behind it (see model_signature); cassette keys leave it out.
+    """
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "tools": list(tools or []),
+        "messages": normalize_messages(messages),
+    }
+    if scope is not None:
+        payload["scope"] = scope
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def model_signature(chat_model: BaseChatModel) -> dict[str, Any]:
+    """The chat model's class and answer-shaping settings, with wrappers described through the model they wrap."""
+    signature = {
+        "class": type(chat_model).__name__,
+        "params": chat_model._identifying_params,
+        "endpoint": getattr(chat_model, "openai_api_base", None),
+    }
+    inner = getattr(chat_model, "inner", None)
+    if isinstance(inner, BaseChatModel):
+        signature["inner"] = model_signature(inner)
+    return signature
+
+
+class CassetteChatModel(BaseChatModel):
+    """Chat model that records completions to, or replays them from, a cassette directory.
+
+    Each request is stored as ``<request_key>.json`` holding the normalized
+    request and the response message, tool calls included. In ``record``
+    mode requests are forwarded to ``inner`` and saved; in ``replay`` mode
+    they are served from disk and a missing entry raises CassetteMissError.
+    Every miss is also kept in ``misses`` so a whole run can be reported on.
+    """
+
+    inner: Optional[BaseChatModel] = None
+    mode: str = "replay"
+    cassette_dir: str = str(DEFAULT_CASSETTE_DIR)
+    model: str = "gpt-4"
+    temperature: float = 0.0
+    misses: list = Field(default_factory=list)
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cassette-{self.mode}"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"mode": self.mode, "cassette_dir": self.cassette_dir, "model": self.model, "temperature": self.temperature}
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _path(self, key: str) -> Path:
+        return Path(self.cassette_dir) / f"{key}.json"
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        key = request_key(self.model, self.temperature, kwargs.get("tools", []), messages)
+        path = self._path(key)
+
+        if self.mode == "replay":
+            if not path.exists():
+                last = next((m.content for m in reversed(messages) if m.type == "human"), "")
+                with self._lock:
+                    self.misses.append({"key": key, "query": last})
+                raise CassetteMissError(f"No recorded response for request {key[:12]} (query: {last!r}) in {self.cassette_dir}")
+            with open(path) as f:
+                entry = json.load(f)
+            message = messages_from_dict([entry["response"]])[0]
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+        if self.inner is None:
+            raise ValueError("record mode needs an inner chat model")
+        result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        entry = {
+            "request": {"model": self.model, "temperature": self.temperature, "messages": normalize_messages(messages)},
+            "response": message_to_dict(result.generations[0].message),
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(entry, f, indent=2)
+        os.replace(tmp, path)
+        return result
+
+
+class StubChatModel(BaseChatModel):
+    """Deterministic offline stand-in for the triage LLM.
+
+    Follows the system prompt's script without a network call: search every
+    source, reference an existing ticket if a Jira result shares most of the
+    report's words, otherwise create one at the priority the keyword rules
+    give, then summarize. Meant for benchmarks and service tests, where the
+    graph and tool work around the model is what is being measured.
+    ``latency`` adds a fixed delay per call to stand in for provider time.
+    """
+
+    latency: float = 0.0
+    calls: int = 0
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    @staticmethod
+    def _existing_ticket(query: str, jira_results: str) -> Optional[str]:
+        words = {w for w in re.findall(r"[a-z0-9]+", query.lower()) if len(w) > 3}
+        for block in jira_results.split("\n\n"):
+            m = re.match(r"\[([A-Z]+-\d+)\]", block)
+            summary = re.search(r"Summary: (.*)", block)
+            if m and summary and words:
+                shared = words & set(re.findall(r"[a-z0-9]+", summary.group(1).lower()))
+                if len(shared) * 2 >= len(words) + 1:
+                    return m.group(1)
+        return None
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(messages, kwargs)
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(messages, kwargs)
+
+    def _respond(self, messages: list[BaseMessage], kwargs: dict[str, Any]) -> ChatResult:
+        from setup_agent.classifier_rules import classify_texts
+
+        with self._lock:
+            self.calls += 1
+
+        query = next((m.content for m in messages if m.type == "human"), "")
+        _, severity = next(classify_texts([query]))
+        if not kwargs.get("tools"):
+            # Plain completion with no tools bound, e.g. a targeted summary request
+            wording = {"critical": " Critical, urgent P0 issue.", "trivial": " Low priority, minor issue."}.get(severity, "")
+            message = AIMessage(content=f"Summary: {query.splitlines()[0] if query else ''}.{wording}")
+            return self._with_usage(messages, message)
+        called = {tc["name"] for m in messages for tc in (getattr(m, "tool_calls", None) or [])}
+        results = {m.name: m.content for m in messages if m.type == "tool"}
+        call_id = f"stub_{len(messages)}"
+
+        searches = ["jira_search"] if severity == "trivial" else ["jira_search", "slack_search", "github_search"]
+        missing = [name for name in searches if name not in called]
+
+        if missing:
+            tool_calls = [{"name": name, "args": {"query": query}, "id": f"{call_id}_{i}"} for i, name in enumerate(missing)]
+            message = AIMessage(content="", tool_calls=tool_calls)
+        else:
+            existing = self._existing_ticket(query, results.get("jira_search", ""))
+            if severity == "trivial":
+                message = AIMessage(content=f"Summary: '{query}' is a low priority, minor cosmetic issue. No ticket needed.")
+            elif existing:
+                message = AIMessage(content=f"Summary: Found existing ticket {existing} for '{query}'. No new ticket created.")
+            elif "jira_create" not in called:
+                args = {"summary": query, "description": query, "priority": STUB_PRIORITIES.get(severity, "P2")}
+                message = AIMessage(content="", tool_calls=[{"name": "jira_create", "args": args, "id": f"{call_id}_0"}])
+            else:
+                urgency = " Critical, urgent P0 issue." if severity == "critical" else ""
+                message = AIMessage(content=f"Summary: {results.get('jira_create', '')}.{urgency} Findings from Jira, Slack and GitHub reviewed.")
+
+        return self._with_usage(messages, message)
+
+    @staticmethod
+    def _with_usage(messages: list[BaseMessage], message: AIMessage) -> ChatResult:
+        prompt_chars = sum(len(m.content) for m in messages if isinstance(m.content, str))
+        output_chars = len(message.content) + len(json.dumps(message.tool_calls))
+        message.usage_metadata = {"input_tokens": prompt_chars // 4, "output_tokens": output_chars // 4,
+                                  "total_tokens": (prompt_chars + output_chars) // 4}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class TokenBucket:
+    """Rate limiter refilling ``rate`` tokens per second, holding at most ``burst``.
+
+    ``reserve`` takes a token straight away and returns how long the caller
+    must wait before using it; the balance goes negative while callers are
+    queued. The same bucket therefore paces threads (``time.sleep``) and
+    coroutines (``asyncio.sleep``).
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class LimitedChatModel(BaseChatModel):
+    """Wraps ``inner`` so at most ``max_concurrent`` calls are in flight, paced to ``rate`` calls per second.
+
+    A call first waits for a free slot, then for a token from the bucket
+    (``rate`` 0 turns pacing off). Sync and async calls draw from the same
+    ``max_concurrent`` slots and the same bucket; async callers wait for a
+    slot without blocking their event loop. ``stats`` reports calls,
+    current and peak concurrency, and time spent throttled.
+    """
+
+    inner: BaseChatModel
+    max_concurrent: int = 8
+    rate: float = 0.0
+    burst: int = 1
+
+    _slots: threading.BoundedSemaphore = PrivateAttr()
+    _waiters: list = PrivateAttr(default_factory=list)
+    _bucket: Optional[TokenBucket] = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _stats: dict = PrivateAttr(default_factory=lambda: {"calls": 0, "in_flight": 0, "peak_in_flight": 0, "throttled_calls": 0, "throttled_seconds": 0.0})
+
+    def model_post_init(self, __context: Any) -> None:
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        if self.rate > 0:
+            self._bucket = TokenBucket(self.rate, self.burst)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"limited-{self.inner._llm_type}"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _count(self, delta: int, waited: float = 0.0) -> None:
+        with self._lock:
+            stats = self._stats
+            stats["in_flight"] += delta
+            if delta > 0:
+                stats["calls"] += 1
+                stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+            if waited:
+                stats["throttled_calls"] += 1
+                stats["throttled_seconds"] += waited
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["throttled_seconds"] = round(stats["throttled_seconds"], 3)
+        return {"max_concurrent": self.max_concurrent, "rate": self.rate, **stats}
+
+    async def _acquire(self) -> None:
+        """Take a slot from the shared pool, parking on a future instead of blocking the loop."""
+        loop = asyncio.get_running_loop()
+        while not self._slots.acquire(blocking=False):
+            waiter = loop.create_future()
+            with self._lock:
+                self._waiters.append((loop, waiter))
+            try:
+                # A release between the failed acquire and registering would be missed.
+                if self._slots.acquire(blocking=False):
+                    return
+                await waiter
+            finally:
+                with self._lock:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+
+    def _release(self) -> None:
+        self._slots.release()
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:  # loop already closed
+                pass
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self._slots.acquire()
+        try:
+            wait = self._bucket.reserve() if self._bucket else 0.0
+            if wait:
+                time.sleep(wait)
+            self._count(1, wait)
+            try:
+                return self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            finally:
+                self._count(-1)
+        finally:
+            self._release()
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await self._acquire()
+        try:
+            wait = self._bucket.reserve() if self._bucket else 0.0
+            if wait:
+                await asyncio.sleep(wait)
+            self._count(1, wait)
+            try:
+                return await self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            finally:
+                self._count(-1)
+        finally:
+            self._release()
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def make_chat_model(model: str, temperature: float, backend: str = None, cassette_dir: str = None) -> BaseChatModel:
+    """Build the chat model for ``backend`` (live, record, replay or stub; default from LLM_BACKEND)."""
+    backend = backend or os.getenv("LLM_BACKEND", "live")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    cassette_dir = str(cassette_dir or os.getenv("LLM_CASSETTE_DIR", DEFAULT_CASSETTE_DIR))
+
+    if backend == "stub":
+        return StubChatModel(latency=float(os.getenv("LLM_STUB_LATENCY_MS", "0")) / 1000)
+    if backend == "replay":
+        return CassetteChatModel(mode="replay", cassette_dir=cassette_dir, model=model, temperature=temperature)
+
+    from langchain_openai import ChatOpenAI
+    live = ChatOpenAI(model=model, temperature=temperature)
+    if backend == "live":
+        return live
+    return CassetteChatModel(inner=live, mode="record", cassette_dir=cassette_dir, model=model, temperature=temperature)
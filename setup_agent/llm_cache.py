@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / ".llm_cache"
+DEFAULT_MEMORY_ENTRIES = 1024
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+
+
+class ResponseCache:
+    """Two-tier cache of chat completions keyed by ``llm_backend.request_key``.
+
+    The memory tier is an LRU bounded by entry count. The optional disk tier
+    keeps one JSON file per key and evicts least recently used files once
+    their total size exceeds ``max_disk_bytes``. Entries are stored as
+    message dicts and rebuilt on every hit, so callers always get a fresh
+    message object.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MEMORY_ENTRIES, cache_dir: Path | None = None, max_disk_bytes: int = DEFAULT_DISK_BYTES):
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: OrderedDict[str, dict] = OrderedDict()
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "puts": 0, "memory_evictions": 0, "disk_evictions": 0}
+
+        if self.cache_dir and self.cache_dir.exists():
+            files = sorted(self.cache_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+            for p in files:
+                size = p.stat().st_size
+                self._disk[p.stem] = size
+                self._disk_bytes += size
+
+    def _remember(self, key: str, record: dict) -> None:
+        self._memory[key] = record
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["memory_evictions"] += 1
+
+    def get(self, key: str) -> BaseMessage | None:
+        with self._lock:
+            record = self._memory.get(key)
+            if record is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return messages_from_dict([record])[0]
+
+            if key in self._disk:
+                path = self.cache_dir / f"{key}.json"
+                try:
+                    with open(path) as f:
+                        record = json.load(f)
+                    os.utime(path)
+                except (OSError, ValueError):
+                    self._disk_bytes -= self._disk.pop(key)
+                else:
+                    self._disk.move_to_end(key)
+                    self._remember(key, record)
+                    self._stats["disk_hits"] += 1
+                    return messages_from_dict([record])[0]
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, message: BaseMessage) -> None:
+        record = message_to_dict(message)
+        with self._lock:
+            self._stats["puts"] += 1
+            self._remember(key, record)
+            if self.cache_dir is None:
+                return
+
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self.cache_dir / f"{key}.json"
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(record, f)
+            os.replace(tmp, path)
+
+            size = path.stat().st_size
+            self._disk_bytes += size - self._disk.pop(key, 0)
+            self._disk[key] = size
+            while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+                old_key, old_size = self._disk.popitem(last=False)
+                self._disk_bytes -= old_size
+                self._stats["disk_evictions"] += 1
+                try:
+                    (self.cache_dir / f"{old_key}.json").unlink()
+                except FileNotFoundError:
+                    pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self.cache_dir:
+                for key in self._disk:
+                    (self.cache_dir / f"{key}.json").unlink(missing_ok=True)
+            self._disk.clear()
+            self._disk_bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = len(self._disk)
+            stats["disk_bytes"] = self._disk_bytes
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide cache; the disk tier lives in LLM_CACHE_DIR (default .llm_cache/)."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(
+                max_entries=int(os.getenv("LLM_CACHE_ENTRIES", DEFAULT_MEMORY_ENTRIES)),
+                cache_dir=Path(os.getenv("LLM_CACHE_DIR", DEFAULT_CACHE_DIR)),
+                max_disk_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", DEFAULT_DISK_BYTES)),
+            )
+        return _default_cache
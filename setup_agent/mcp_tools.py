@@ -1,64 +1,200 @@
-import json
+import asyncio
+import functools
+import hashlib
+import heapq
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Optional
 from langchain_core.tools import tool
 
+from setup_agent.fixture_store import fixture_store
+from setup_agent.instrumentation import timed_tool
+from setup_agent.jira_journal import JiraJournal
+from setup_agent.search_index import InvertedIndex, tokenize
+
 FIXTURES_PATH = Path(__file__).parent.parent / "setup_seed_data" / "mcp_fixtures"
 
+JIRA_TOP_K = 5
+
+GITHUB_TOP_K = 5
+# Title words count this many times as often as body words
+GITHUB_TITLE_BOOST = 3
+
+# Where the tools read fixtures from: the JSON files, or the SQLite FTS5 database built by sqlite_store
+STORAGE_BACKENDS = ("json", "sqlite")
+
+SLACK_PAGE_SIZE = 3
+# Recent threads get up to SLACK_RECENCY_WEIGHT extra relevance, halving every SLACK_RECENCY_HALF_LIFE_DAYS
+SLACK_RECENCY_WEIGHT = 0.5
+SLACK_RECENCY_HALF_LIFE_DAYS = 30
+
+_fixtures_override: ContextVar[Path | None] = ContextVar("fixtures_override", default=None)
+
+_jira_journals: dict[Path, JiraJournal] = {}
+_jira_indexes: dict[Path, InvertedIndex] = {}
+_jira_lock = threading.Lock()
+
+# Indexes derived from a fixture file, keyed by path and tagged with the fixture_store version they were built from
+_slack_indexes: dict[Path, tuple[Any, "SlackIndex"]] = {}
+_github_indexes: dict[Path, tuple[Any, InvertedIndex]] = {}
+_index_lock = threading.Lock()
+
+_sqlite_stores: dict[Path, Any] = {}
+
+# Bounded pool for the blocking fixture I/O behind the async tools, so an event loop never waits on disk
+_io_executor = ThreadPoolExecutor(max_workers=int(os.getenv("FIXTURE_IO_WORKERS", "8")), thread_name_prefix="fixture-io")
+
+def _ticket_text(t: dict[str, Any]) -> str:
+    return " ".join([t.get("summary", ""), t.get("description", ""), t.get("status", ""), t.get("priority", ""), t.get("type", ""), " ".join(t.get("labels", []))])
+
+def fixtures_path() -> Path:
+    """Fixture directory for the current context: a sandbox if one is active, else FIXTURES_PATH."""
+    return _fixtures_override.get() or FIXTURES_PATH
+
+def fixture_version() -> str:
+    """Fingerprint of the current fixture directory; it changes whenever a fixture, the Jira journal or the SQLite store is written."""
+    path = fixtures_path()
+    digest = hashlib.sha256(str(path.resolve()).encode())
+    for p in sorted(path.iterdir()) if path.exists() else []:
+        if p.suffix in (".lock", ".tmp") or p.name.endswith("-shm"):
+            continue
+        st = p.stat()
+        digest.update(f"{p.name}:{st.st_mtime_ns}:{st.st_size}\n".encode())
+    return digest.hexdigest()[:16]
+
+@contextmanager
+def use_fixtures(path: Path):
+    token = _fixtures_override.set(Path(path))
+    try:
+        yield Path(path)
+    finally:
+        _fixtures_override.reset(token)
+
+def release_fixtures(path: Path) -> None:
+    """Drop the cached journal, index and parsed files held for a fixture directory."""
+    path = Path(path)
+    with _jira_lock:
+        journal = _jira_journals.pop(path / "jira_tickets.json", None)
+        _jira_indexes.pop(path / "jira_tickets.json", None)
+    with _index_lock:
+        _slack_indexes.pop(path / "slack_messages.json", None)
+        _github_indexes.pop(path / "github_issues.json", None)
+        store = _sqlite_stores.pop(path, None)
+    if store is not None:
+        store.close()
+    if journal is not None:
+        journal.close()
+    for name in ("jira_tickets.json", "slack_messages.json", "github_issues.json"):
+        fixture_store.invalidate(path / name)
+
+@contextmanager
+def fixture_sandbox():
+    """Run tools against a private copy of the current fixtures so writes stay isolated."""
+    with tempfile.TemporaryDirectory(prefix="mcp_fixtures_") as tmp:
+        shutil.copytree(fixtures_path(), tmp, dirs_exist_ok=True, ignore=shutil.ignore_patterns("*.lock", "*.tmp"))
+        try:
+            with use_fixtures(tmp) as path:
+                yield path
+        finally:
+            release_fixtures(Path(tmp))
+
+async def run_blocking(fn: Callable, *args, **kwargs) -> Any:
+    """Await ``fn(*args, **kwargs)`` on the fixture I/O pool, in a copy of the caller's context.
+
+    The copy carries the active fixture sandbox and metrics collector into
+    the worker thread, as run_tool_calls does for the sync path.
+    """
+    call = functools.partial(copy_context().run, fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(_io_executor, call)
+
+def storage_backend() -> str:
+    backend = os.getenv("FIXTURE_BACKEND", "json")
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown fixture backend {backend!r}; expected one of {', '.join(STORAGE_BACKENDS)}")
+    return backend
+
+def get_sqlite_store():
+    """SQLite store for the current fixture directory (FIXTURE_BACKEND=sqlite)."""
+    from setup_agent.sqlite_store import SqliteStore, DB_NAME
+
+    path = fixtures_path()
+    with _index_lock:
+        store = _sqlite_stores.get(path)
+        if store is None:
+            store = _sqlite_stores[path] = SqliteStore(path / DB_NAME, tickets_path=path / "jira_tickets.json")
+        return store
+
+def get_jira_journal() -> JiraJournal:
+    """Journal for the current Jira fixture; its subscribers keep the search index in step with every write."""
+    path = fixtures_path() / "jira_tickets.json"
+    with _jira_lock:
+        journal = _jira_journals.get(path)
+        if journal is None:
+            journal = _jira_journals[path] = JiraJournal(path)
+
+            def on_reset(tickets):
+                index = InvertedIndex()
+                index.add_many((t["key"], _ticket_text(t), t) for t in tickets)
+                _jira_indexes[path] = index
+
+            def on_ticket(ticket):
+                _jira_indexes[path].add(ticket["key"], _ticket_text(ticket), ticket)
+
+            journal.subscribe(on_reset, on_ticket)
+    return journal
+
+def get_jira_index() -> InvertedIndex:
+    """Inverted index over all Jira tickets, including journaled ones not yet compacted into the snapshot.
+
+    With the SQLite backend this is a view with the same search/get/idf interface.
+    """
+    if storage_backend() == "sqlite":
+        from setup_agent.sqlite_store import TicketView
+        return TicketView(get_sqlite_store())
+    journal = get_jira_journal()
+    journal.refresh()
+    return _jira_indexes[journal.snapshot_path]
+
+# Fixture data is shared through the process-wide store; callers must not mutate it.
 def load_jira_data() -> dict[str, Any]:
-    path = FIXTURES_PATH / "jira_tickets.json"
-    if path.exists():
-        with open(path) as f:
-            return json.load(f)
-    return {"tickets": []}
+    return {"tickets": get_jira_journal().tickets()}
 
 def load_slack_data() -> dict[str, Any]:
-    path = FIXTURES_PATH / "slack_messages.json"
-    if path.exists():
-        with open(path) as f:
-            return json.load(f)
-    return {"channels": [], "messages": []}
+    return fixture_store.get(fixtures_path() / "slack_messages.json", lambda: {"channels": [], "messages": []})
 
 def load_github_data() -> dict[str, Any]:
-    path = FIXTURES_PATH / "github_issues.json"
-    if path.exists():
-        with open(path) as f:
-            return json.load(f)
-    return {"issues": []}
+    return fixture_store.get(fixtures_path() / "github_issues.json", lambda: {"issues": []})
 
 @tool
+@timed_tool
 def jira_search(query: str) -> str:
     """Search Jira tickets using a natural language query."""
-    data = load_jira_data()
-
-    tickets = data.get("tickets", [])
-    if not tickets:
+    index = get_jira_index()
+    if not len(index):
         return "No Jira data available."
-    query_lower = query.lower()
-    matched = []
-    for t in tickets:
-        searchable = " ".join([t.get("summary", ""), t.get("description", ""), t.get("status", ""), t.get("priority", ""), t.get("type", ""), " ".join(t.get("labels", []))]).lower()
-        if any(word in searchable for word in query_lower.split() if len(word) > 3):
-            matched.append(t)
+    matched = [t for t, _ in index.search(query, k=JIRA_TOP_K)]
     if not matched:
         return "No matching tickets found."
     formatted = []
-    for t in matched[:5]:
+    for t in matched:
         formatted.append(f"[{t['key']}] [{t.get('priority','N/A')}] [{t.get('status','Unknown')}]\nType: {t.get('type','Ticket')}\nSummary: {t.get('summary','No summary')}\nAssignee: {t.get('assignee') or 'Unassigned'}\nLabels: {', '.join(t.get('labels',[])) or 'None'}")
     return "\n\n".join(formatted)
     
 @tool
+@timed_tool
 def jira_create(summary: str, description: str, priority: str = "P2") -> str:
     """
     Create a new Jira ticket when no existing ticket matches the issue.
     """
-    data = load_jira_data()
-    tickets = data.setdefault("tickets", [])
-
-    new_id = f"CSE-{len(tickets) + 1}"
-
-    ticket = {
-        "key": new_id,
+    writer = get_sqlite_store().create_ticket if storage_backend() == "sqlite" else get_jira_journal().create
+    ticket = writer({
         "summary": summary,
         "description": description,
         "status": "Open",
@@ -69,45 +205,181 @@ def jira_create(summary: str, description: str, priority: str = "P2") -> str:
         "component": None,
         "team": None,
         "client": None,
-    }
+    })
+
+    return f"Created new Jira ticket {ticket['key']}: {summary}"
+
+def parse_ts(ts: str) -> datetime | None:
+    try:
+        return datetime.fromisoformat(ts)
+    except (TypeError, ValueError):
+        return None
+
+def normalize_channel(channel: str) -> str:
+    return channel.strip().lstrip("#").lower()
+
+def recency_boost(last: float | None, newest: float | None) -> float:
+    """Ranking multiplier for a thread last active at ``last``, relative to the newest thread in the export.
+
+    Measuring from the newest thread rather than the wall clock means a given export always ranks the same way.
+    """
+    if last is None or newest is None:
+        return 1.0
+    return 1 + SLACK_RECENCY_WEIGHT * 0.5 ** ((newest - last) / (SLACK_RECENCY_HALF_LIFE_DAYS * 86400))
+
+class SlackIndex:
+    """Token index over Slack threads with the per-thread facts filters and ranking need.
+
+    Thread ``i`` of the fixture is document ``i``; its channel, first and last
+    activity (epoch seconds) and recency boost sit in parallel lists, so a
+    query never has to touch message lists or parse timestamps.
+    """
+
+    def __init__(self, threads: list[dict[str, Any]]):
+        self.threads = threads
+        self.index = InvertedIndex()
+        self.channels: list[str] = []
+        self.first: list[float | None] = []
+        self.last: list[float | None] = []
+        for i, thread in enumerate(threads):
+            stamps = [ts.timestamp() for ts in (parse_ts(m.get("ts")) for m in thread.get("thread", [])) if ts is not None]
+            self.channels.append(normalize_channel(thread.get("channel", "")))
+            self.first.append(min(stamps) if stamps else None)
+            self.last.append(max(stamps) if stamps else None)
+            self.index.add(i, " ".join(m.get("text", "") for m in thread.get("thread", [])))
 
-    tickets.append(ticket)
+        newest = max((t for t in self.last if t is not None), default=None)
+        self.boost = [recency_boost(t, newest) for t in self.last]
 
-    path = FIXTURES_PATH / "jira_tickets.json"
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
+    def __len__(self) -> int:
+        return len(self.threads)
 
-    return f"Created new Jira ticket {new_id}: {summary}"
+    def search(self, query: str, channel: str | None = None, start: float | None = None, end: float | None = None,
+               offset: int = 0, limit: int = SLACK_PAGE_SIZE) -> tuple[list[dict[str, Any]], int]:
+        """One page of matching threads, best first, plus the total number of matches."""
+        # No searchable words: rank every thread that passes the filters by recency alone
+        scores = self.index.scores(query) if tokenize(query) else dict.fromkeys(range(len(self.threads)), 1.0)
+        channels, first, last, boost = self.channels, self.first, self.last, self.boost
+        ranked = []
+        for doc_id, score in scores.items():
+            if channel is not None and channels[doc_id] != channel:
+                continue
+            if start is not None and (last[doc_id] is None or last[doc_id] < start):
+                continue
+            if end is not None and (first[doc_id] is None or first[doc_id] > end):
+                continue
+            ranked.append((-score * boost[doc_id], doc_id))
+        top = heapq.nsmallest(offset + limit, ranked)
+        return [self.threads[doc_id] for _, doc_id in top[offset:]], len(ranked)
+
+def _derived_index(cache: dict, path: Path, data: Any, build: Callable[[Any], Any]) -> Any:
+    """Return ``build(data)`` for ``path``, reusing the cached build while the fixture version is unchanged."""
+    version = fixture_store.version(path)
+    cached = cache.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _index_lock:
+        cached = cache.get(path)
+        if cached is None or cached[0] != version:
+            cached = cache[path] = (version, build(data))
+        return cached[1]
+
+def get_slack_index() -> SlackIndex:
+    """Slack thread index for the current fixture, rebuilt when the file changes on disk."""
+    if storage_backend() == "sqlite":
+        from setup_agent.sqlite_store import ThreadView
+        return ThreadView(get_sqlite_store())
+    return _derived_index(_slack_indexes, fixtures_path() / "slack_messages.json", load_slack_data(),
+                          lambda data: SlackIndex(data.get("messages", [])))
+
+def _build_github_index(data: dict[str, Any]) -> InvertedIndex:
+    index = InvertedIndex()
+    index.add_many(
+        (i, " ".join([issue.get("title", "")] * GITHUB_TITLE_BOOST + [issue.get("body", "")]), issue)
+        for i, issue in enumerate(data.get("issues", []))
+    )
+    return index
+
+def get_github_index() -> InvertedIndex:
+    """BM25 index over GitHub issue titles and bodies, rebuilt when the fixture changes on disk."""
+    if storage_backend() == "sqlite":
+        from setup_agent.sqlite_store import IssueView
+        return IssueView(get_sqlite_store())
+    return _derived_index(_github_indexes, fixtures_path() / "github_issues.json", load_github_data(), _build_github_index)
+
+def _parse_window(since: Optional[str], until: Optional[str]) -> tuple[datetime | None, datetime | None]:
+    start = parse_ts(since) if since else None
+    end = parse_ts(until) if until else None
+    if (since and start is None) or (until and end is None):
+        raise ValueError("since/until must be ISO dates like 2026-01-25 or 2026-01-25T12:00:00")
+    # A bare date as the end of the window includes that whole day
+    if end is not None and len(until.strip()) == 10:
+        end += timedelta(days=1) - timedelta(microseconds=1)
+    return start, end
 
 @tool
-def slack_search(query: str) -> str:
-    """Search Slack messages and threads for relevant discussions."""
-    data = load_slack_data()
-    messages = data.get("messages", [])
-    if not messages:
+@timed_tool
+def slack_search(query: str, channel: Optional[str] = None, since: Optional[str] = None,
+                 until: Optional[str] = None, page: int = 1) -> str:
+    """Search Slack messages and threads for relevant discussions.
+
+    Results are ranked by relevance with a boost for recent activity.
+    Optionally restrict to one ``channel`` (e.g. "#bugs") and to threads
+    active between ``since`` and ``until`` (ISO dates). Use ``page`` to see
+    further results.
+    """
+    index = get_slack_index()
+    if not len(index):
         return "No Slack data available."
-    query_lower = query.lower()
-    matched = []
-    for thread in messages:
-        thread_text = " ".join([m.get("text", "") for m in thread.get("thread", [])]).lower()
-        if any(word in thread_text for word in query_lower.split() if len(word) > 3):
-            matched.append(thread)
-    if not matched:
+    try:
+        start, end = _parse_window(since, until)
+    except ValueError as e:
+        return f"Error: {e}"
+
+    page = max(1, page)
+    offset = (page - 1) * SLACK_PAGE_SIZE
+    threads, total = index.search(query, channel=normalize_channel(channel) if channel else None,
+                                  start=start.timestamp() if start else None, end=end.timestamp() if end else None,
+                                  offset=offset)
+    if not total:
         return "No matching Slack conversations found."
+    pages = (total + SLACK_PAGE_SIZE - 1) // SLACK_PAGE_SIZE
+    if not threads:
+        return f"No more Slack results: {total} matching threads over {pages} page(s)."
+
     formatted = []
-    for t in matched[:3]:
+    for t in threads:
         lines = [f"#{t['channel']}\n" + '-'*40]
         for msg in t['thread']:
             lines.append(f"{msg.get('user','Unknown')} ({msg.get('ts','')}):\n{msg.get('text','')}\n")
         formatted.append("\n".join(lines))
+    if pages > 1:
+        formatted.insert(0, f"Showing {offset + 1}-{offset + len(threads)} of {total} matching threads (page {page} of {pages}).")
     return "\n\n".join(formatted)
 
 @tool
+@timed_tool
 def github_search(query: str) -> str:
-    """Search GitHub issues by title."""
-    data = load_github_data()
-    issues = data.get("issues", [])
-    matched = [i for i in issues if query.lower() in i.get('title','').lower()]
+    """Search GitHub issues by title and body; returns the best matches with relevance scores."""
+    matched = get_github_index().search(query, k=GITHUB_TOP_K)
     if not matched:
         return "No matching GitHub issues found."
-    return "\n".join([f"[{i['id']}] {i['title']}" for i in matched])
+    lines = []
+    for i, score in matched:
+        state = f" [{i['state']}]" if i.get("state") else ""
+        lines.append(f"[{i['id']}] {i['title']}{state} (score {score:.2f})")
+        if i.get("body"):
+            lines.append(f"    {i['body'][:160]}")
+    return "\n".join(lines)
+
+def _add_coroutine(t) -> None:
+    """Give a tool an ``ainvoke`` path that runs its blocking body on the fixture I/O pool."""
+    func = t.func
+
+    async def coroutine(*args, **kwargs):
+        return await run_blocking(func, *args, **kwargs)
+
+    t.coroutine = coroutine
+
+for _tool in (jira_search, jira_create, slack_search, github_search):
+    _add_coroutine(_tool)
@@ -1,17 +1,57 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from typing import Annotated
 
-from langchain_openai import ChatOpenAI
-from langgraph.graph import StateGraph, END
-from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.tools import tool as _tool  # noqa: F401  used by mcp_tools; resolved here so its load counts as a dependency
 
-from setup_agent.mcp_tools import jira_search, slack_search, github_search, jira_create
-from dotenv import load_dotenv
-load_dotenv()
+# Everything above is stdlib or third-party; STARTUP_STATS['import_ms'] times only our modules from here on
+_OWN_IMPORT_STARTED = time.perf_counter()
+
+from setup_agent.mcp_tools import jira_search, slack_search, github_search, jira_create, get_jira_index, run_blocking, fixtures_path, fixture_version
+from setup_agent.classifier_rules import CLASSIFIER_RULES, classify_categories, compile_rules
+from setup_agent.coalesce import SingleFlight, coalescing_enabled, normalize_query
+from setup_agent.context import compact_messages, context_budget, truncate
+from setup_agent.dedupe import dedupe_threshold, find_duplicate
+from setup_agent.instrumentation import get_exporter, merge_metrics, metrics_breakdown, record_compaction, record_llm_call, timed_node
 
 
 TOOLS = [jira_search, slack_search, github_search, jira_create]
+TOOLS_BY_NAME = {t.name: t for t in TOOLS}
+
+# Shared pool for tool calls the graph makes directly rather than through the LLM
+_tool_executor = ThreadPoolExecutor(max_workers=int(os.getenv('TOOL_WORKERS', '16')), thread_name_prefix='triage-tool')
+
+# Identical reports already in flight share one graph run
+_flights = SingleFlight()
+
+# Checkpointed copies of compiled agents, made when RUN_STORE is set
+_checkpointed_agents = weakref.WeakKeyDictionary()
+
+_agent_cache = {}
+_agent_cache_lock = threading.Lock()
+_env_loaded = False
+
+DEFAULT_MODEL = 'gpt-4'
+
+STARTUP_STATS = {'deps_import_ms': None, 'import_ms': None, 'agents_built': 0, 'build_ms': 0.0, 'agent_cache_hits': 0}
+
+def _load_env() -> None:
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
 
 DEFAULT_SYSTEM_PROMPT = """You are Smart Bug Triage AI.
 
@@ -25,6 +65,134 @@ When investigating an issue:
 Do not create duplicate tickets if one already exists.
 """
 
+def _tool_call_requests(calls: list[tuple[str, dict]], call_id_prefix: str) -> list[dict]:
+    return [
+        {'name': name, 'args': args, 'id': f'{call_id_prefix}_{i}_{name}'}
+        for i, (name, args) in enumerate(calls)
+    ]
+
+def _tool_error(tc: dict, e: Exception) -> ToolMessage:
+    return ToolMessage(content=f"Error: {e!r}", name=tc['name'], tool_call_id=tc['id'], status='error')
+
+def run_tool_calls(calls: list[tuple[str, dict]], call_id_prefix: str = 'direct') -> list:
+    """Run tool calls concurrently without a model round trip.
+
+    Returns an AIMessage carrying the tool_calls followed by one ToolMessage
+    per call, the same shape ToolNode would append, so downstream checks and
+    the model see them as ordinary tool use. Each call runs in a copy of the
+    caller's context so fixture sandboxes carry over to the worker threads.
+    """
+    tool_calls = _tool_call_requests(calls, call_id_prefix)
+    return [AIMessage(content='', tool_calls=tool_calls)] + run_tool_requests(tool_calls)
+
+def run_tool_requests(tool_calls: list[dict]) -> list:
+    """One ToolMessage per already-issued tool call (e.g. a model's ``tool_calls``), run concurrently."""
+    def run(tc):
+        try:
+            return ToolMessage(content=TOOLS_BY_NAME[tc['name']].invoke(tc['args']), name=tc['name'], tool_call_id=tc['id'])
+        except Exception as e:
+            return _tool_error(tc, e)
+
+    futures = [_tool_executor.submit(copy_context().run, run, tc) for tc in tool_calls]
+    return [f.result() for f in futures]
+
+async def arun_tool_calls(calls: list[tuple[str, dict]], call_id_prefix: str = 'direct') -> list:
+    """Async run_tool_calls: the calls are awaited together on the tools' async path."""
+    tool_calls = _tool_call_requests(calls, call_id_prefix)
+    return [AIMessage(content='', tool_calls=tool_calls)] + await arun_tool_requests(tool_calls)
+
+async def arun_tool_requests(tool_calls: list[dict]) -> list:
+    async def run(tc):
+        try:
+            return ToolMessage(content=await TOOLS_BY_NAME[tc['name']].ainvoke(tc['args']), name=tc['name'], tool_call_id=tc['id'])
+        except Exception as e:
+            return _tool_error(tc, e)
+
+    return list(await asyncio.gather(*(run(tc) for tc in tool_calls)))
+
+SEARCH_TOOL_NAMES = ('jira_search', 'slack_search', 'github_search')
+
+def _search_calls(query: str, severity: str) -> list[tuple[str, dict]]:
+    names = ('jira_search',) if severity == 'trivial' else SEARCH_TOOL_NAMES
+    return [(name, {'query': query}) for name in names]
+
+def search_sources(query: str, severity: str) -> list:
+    """Run the searches a report of ``severity`` needs; trivial reports only check Jira."""
+    return run_tool_calls(_search_calls(query, severity), 'search')
+
+async def asearch_sources(query: str, severity: str) -> list:
+    return await arun_tool_calls(_search_calls(query, severity), 'search')
+
+def user_query(messages) -> str:
+    for m in messages:
+        if hasattr(m, 'content') and not isinstance(m, SystemMessage):
+            return m.content
+    return ""
+
+PRIORITY_BY_SEVERITY = {'critical': 'P0', 'high': 'P1', 'medium': 'P2', 'minor': 'P3'}
+
+TICKET_RE = re.compile(r'(CSE-\d+)', re.IGNORECASE)
+
+# Phrases verify, determine_action and finalize look for anywhere in the conversation
+TRACKED_KEYWORDS = ('existing', 'found', 'already', 'duplicate', 'cse-', 'low priority',
+                    'minor', 'p0', 'critical', 'urgent')
+
+def track_messages(state) -> None:
+    """Fold messages appended since the last call into the running counters on ``state``.
+
+    Each message is scanned exactly once over a run, so the checks in
+    verify, determine_action and finalize cost O(new messages) rather than
+    a rescan of the whole history on every retry.
+    """
+    messages = state['messages']
+    start = state.get('messages_scanned', 0)
+    tools_called = set(state.get('tools_called', []))
+    tool_call_log = list(state.get('tool_call_log', []))
+    ticket_ids = list(state.get('ticket_ids', []))
+    keywords_seen = set(state.get('keywords_seen', []))
+    reply_keywords = set(state.get('reply_keywords', []))
+    response_chars = state.get('response_chars', -1)
+
+    for m in messages[start:]:
+        content = m.content if hasattr(m, 'content') and isinstance(m.content, str) else ''
+        # Mirrors len(" ".join(contents)): one separator per message after the first
+        response_chars += len(content) + 1
+        if content:
+            content_lower = content.lower()
+            found = [kw for kw in TRACKED_KEYWORDS if kw in content_lower]
+            keywords_seen.update(found)
+            if isinstance(m, AIMessage):
+                # Only the model's own answers count as citing a ticket, not the instructions it was given
+                reply_keywords.update(found)
+            ids = [t.upper() for t in TICKET_RE.findall(content)]
+            if ids:
+                ticket_ids.extend(t for t in dict.fromkeys(ids) if t not in ticket_ids)
+                state['last_ticket_id'] = ids[0]
+            # Actions come from tool results and the model's answers; the system prompt and instructions also mention tickets
+            if not isinstance(m, (SystemMessage, HumanMessage)):
+                if 'Created new Jira ticket' in content:
+                    state['last_action'] = 'created_new_ticket'
+                elif 'existing jira ticket' in content_lower:
+                    state['last_action'] = 'found_duplicate'
+            if len(content) > 20:
+                state['last_summary'] = content[:300]
+        for tc in getattr(m, 'tool_calls', None) or []:
+            tools_called.add(tc['name'])
+            tool_call_log.append(tc['name'])
+
+    state['messages_scanned'] = len(messages)
+    state['tools_called'] = sorted(tools_called)
+    state['tool_call_log'] = tool_call_log
+    state['ticket_ids'] = ticket_ids
+    state['keywords_seen'] = sorted(keywords_seen)
+    state['reply_keywords'] = sorted(reply_keywords)
+    state['response_chars'] = response_chars
+
+def add_messages(left, right):
+    """LangGraph's add_messages reducer, imported on first use so importing this module stays cheap."""
+    from langgraph.graph.message import add_messages as _add_messages
+    return _add_messages(left, right)
+
 class AgentState(dict):
     messages: Annotated[list, add_messages]
     
@@ -43,12 +211,91 @@ class AgentState(dict):
     duplicate_ticket_id: str = None
     
     final_output: dict = {}
+
+    # Running summaries of `messages`, maintained by track_messages()
+    messages_scanned: int = 0
+    tools_called: list = []
+    tool_call_log: list = []
+    ticket_ids: list = []
+    keywords_seen: list = []
+    reply_keywords: list = []
+    response_chars: int = -1
+    last_ticket_id: str = None
+    last_action: str = None
+    last_summary: str = None
+
+    # Checks that failed on the last verify; repair fills exactly these gaps
+    failed_checks: list = []
+
+    # Per-node, per-tool and LLM timings and token counts, merged across nodes
+    metrics: Annotated[dict, merge_metrics] = {}
     
-def create_agent(model: str = None, temperature: float = 0.0, system_prompt: str = None):
-    model = model or 'gpt-4'
+def create_agent(model: str = None, temperature: float = 0.0, system_prompt: str = None,
+                 backend: str = None, chat_model=None, response_cache=None, classifier_rules=None,
+                 duplicate_threshold: float = None, token_budget: int = None):
+    """Build and compile the triage graph.
+
+    ``backend`` picks the chat model: 'live' (OpenAI), 'record' (OpenAI, saving
+    every exchange to the cassette store) or 'replay' (served from the
+    cassette store, no network). It defaults to the LLM_BACKEND env var.
+    ``chat_model`` overrides all of that with any unbound LangChain chat model.
+
+    ``response_cache`` sits in front of the model. Without one, graphs on
+    the configured backend get default_response_cache(); stub backends and
+    injected chat models run uncached unless a cache is passed in.
+
+    ``classifier_rules`` replaces the keyword table used by classify; it is
+    compiled into a single matcher here, once per agent.
+
+    ``duplicate_threshold`` is the similarity at which a report is treated
+    as a repeat of an existing ticket and answered without the LLM. It
+    defaults to DEDUPE_THRESHOLD (or dedupe.DUPLICATE_THRESHOLD); DEDUPE=off
+    or any value above 1 disables the check.
+
+    ``token_budget`` caps the estimated prompt size of each model call; see
+    context.compact_messages. It defaults to CONTEXT_TOKEN_BUDGET, and
+    CONTEXT_COMPACTION=off sends the full history instead.
+
+    Graphs built without injected components are cached by (model,
+    temperature, system_prompt, backend), so repeated calls reuse one
+    compiled graph. Nothing is built until the first call. Each graph
+    carries a ``run_signature`` naming its configuration, which keys
+    persisted runs (see run_agent).
+    """
+    _load_env()
+    model = model or DEFAULT_MODEL
     agent_system_prompt = system_prompt or DEFAULT_SYSTEM_PROMPT
-    llm = ChatOpenAI(model=model, temperature=temperature).bind_tools(TOOLS)
+    backend = backend or os.getenv('LLM_BACKEND', 'live')
+    if duplicate_threshold is None:
+        duplicate_threshold = dedupe_threshold()
+    if token_budget is None:
+        token_budget = context_budget()
+
+    # Agents built from defaults are shared; injected components make a one-off graph
+    cacheable = chat_model is None and response_cache is None and classifier_rules is None
+    cache_key = (model, temperature, agent_system_prompt, backend, duplicate_threshold, token_budget)
+    if cacheable:
+        with _agent_cache_lock:
+            if cache_key in _agent_cache:
+                STARTUP_STATS['agent_cache_hits'] += 1
+                return _agent_cache[cache_key]
+
+    build_started = time.perf_counter()
+    # Heavy dependencies are only imported once a graph is actually built
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+    from langgraph.graph import StateGraph, END
+    from langgraph.prebuilt import ToolNode
+    from setup_agent.llm_backend import make_chat_model, model_signature, request_key
+
+    if response_cache is None and chat_model is None:
+        response_cache = default_response_cache(backend, temperature)
+    chat_model = chat_model or make_chat_model(model, temperature, backend=backend)
+    llm = chat_model.bind_tools(TOOLS)
+    # Cached answers are only reused by the backend and chat model that produced them
+    cache_scope = {'backend': backend, 'chat_model': model_signature(chat_model)}
+    tool_schemas = [convert_to_openai_tool(t) for t in TOOLS]
     tool_node = ToolNode(TOOLS)
+    keyword_matcher = compile_rules(classifier_rules or CLASSIFIER_RULES)
     
     def init_state(state: AgentState) -> AgentState:
         state.setdefault('retry_count', 0)
@@ -63,6 +310,17 @@ def create_agent(model: str = None, temperature: float = 0.0, system_prompt: str
         state.setdefault('duplicate_found', False)
         state.setdefault('duplicate_ticket_id', None)
         state.setdefault('final_output', {})
+        state.setdefault('messages_scanned', 0)
+        state.setdefault('tools_called', [])
+        state.setdefault('tool_call_log', [])
+        state.setdefault('ticket_ids', [])
+        state.setdefault('keywords_seen', [])
+        state.setdefault('reply_keywords', [])
+        state.setdefault('response_chars', -1)
+        state.setdefault('last_ticket_id', None)
+        state.setdefault('last_action', None)
+        state.setdefault('last_summary', None)
+        state.setdefault('failed_checks', [])
         return state
 
     def should_continue(state: AgentState) -> str:
@@ -71,34 +329,67 @@ def create_agent(model: str = None, temperature: float = 0.0, system_prompt: str
             return 'tools'
         return 'verify'
 
-    def call_model(state: AgentState) -> dict:
-        state = init_state(state)
+    def complete(runnable, schemas: list, messages: list):
+        """One model call through the response cache, counted in the node's metrics."""
+        started = time.perf_counter()
+        response = None
+        if response_cache is not None:
+            key = request_key(model, temperature, schemas, messages, cache_scope)
+            response = response_cache.get(key)
+        if response is not None:
+            record_llm_call(response, time.perf_counter() - started, cached=True)
+            return response
+        response = runnable.invoke(messages)
+        record_llm_call(response, time.perf_counter() - started)
+        if response_cache is not None:
+            response_cache.put(key, response)
+        return response
+
+    async def acomplete(runnable, schemas: list, messages: list):
+        """Async complete: the model is awaited and the cache's disk tier is read and written off the event loop."""
+        started = time.perf_counter()
+        response = None
+        if response_cache is not None:
+            key = request_key(model, temperature, schemas, messages, cache_scope)
+            response = await run_blocking(response_cache.get, key)
+        if response is not None:
+            record_llm_call(response, time.perf_counter() - started, cached=True)
+            return response
+        response = await runnable.ainvoke(messages)
+        record_llm_call(response, time.perf_counter() - started)
+        if response_cache is not None:
+            await run_blocking(response_cache.put, key, response)
+        return response
+
+    def model_prompt(state: AgentState) -> list:
         messages = state['messages']
-        response = llm.invoke(messages)
+        if token_budget is not None:
+            messages, sizes = compact_messages(messages, token_budget)
+            record_compaction(sizes['tokens_before'], sizes['tokens_after'])
+        return messages
+
+    def model_update(state: AgentState, response) -> dict:
         if "Created new Jira ticket" in response.content:
             state['ticket_created'] = True
         if "Summary:" in response.content or "Findings:" in response.content:
             state['summary_done'] = True
         return {'messages':[response]}
+
+    def call_model(state: AgentState) -> dict:
+        state = init_state(state)
+        return model_update(state, complete(llm, tool_schemas, model_prompt(state)))
+
+    async def acall_model(state: AgentState) -> dict:
+        state = init_state(state)
+        return model_update(state, await acomplete(llm, tool_schemas, model_prompt(state)))
         
     def classify_input(state: AgentState) -> dict:
         state = init_state(state)
-        messages = state['messages']
+        is_valid_bug, severity = classify_categories(keyword_matcher.match(user_query(state['messages'])))
         
-        user_query = ""
-        for m in messages:
-            if hasattr(m, 'content') and not isinstance(m, SystemMessage):
-                user_query = m.content
-                break
-        
-        query_lower = user_query.lower()
-        
-        off_topic = ['explain', 'how to', 'what is', 'quantum', 'mechanics', 
-                    'random thought', 'life', 'feature request']
-        
-        if any(kw in query_lower for kw in off_topic):
+        if not is_valid_bug:
             state['is_valid_bug'] = False
-            state['severity'] = 'not_a_bug'
+            state['severity'] = severity
             state['workflow_done'] = True
             state['final_output'] = {
                 'status': 'rejected',
@@ -108,86 +399,88 @@ def create_agent(model: str = None, temperature: float = 0.0, system_prompt: str
             state['step_count'] += 1
             return state
         
-        trivial_keywords = ['typo in footer', 'typo in']
-        is_trivial = any(kw in query_lower for kw in trivial_keywords)
-        
-        critical_keywords = ['crashed completely', 'database crashed', 'production database crashed',
-                           'complete outage', 'all users', 'complete production', 'affecting all']
-        is_critical = any(kw in query_lower for kw in critical_keywords)
-        
-        is_db_prod = 'database' in query_lower and ('prod' in query_lower or 'production' in query_lower)
-        
-        is_login_prod = 'login' in query_lower and ('prod' in query_lower or 'production' in query_lower)
-        
-        high_keywords = ['error', 'failure', 'broken', 'not working', 
-                        'timeout', 'failing', 'leak', 'memory leak', 'api crash']
-        is_high = any(kw in query_lower for kw in high_keywords) or is_db_prod or is_login_prod
-        
-        minor_ui_keywords = ['ui glitch', 'dashboard glitch', 'minor']
-        is_minor_ui = any(kw in query_lower for kw in minor_ui_keywords) and not is_critical and not is_high
-        
-        is_design_issue = 'doesn\'t match design' in query_lower or 'button color' in query_lower
-        
-        is_ambiguous = ('bug or feature' in query_lower or 'is this a bug' in query_lower or 
-                       'feature request' in query_lower)
-        
-        if is_trivial:
-            state['severity'] = 'trivial'
-            state['is_valid_bug'] = True
-        elif is_critical:
-            state['severity'] = 'critical'
-            state['is_valid_bug'] = True
-        elif is_high:
-            state['severity'] = 'high'
-            state['is_valid_bug'] = True
-        elif is_minor_ui:
-            state['severity'] = 'minor'
-            state['is_valid_bug'] = True
-        elif is_design_issue or is_ambiguous:
-            state['severity'] = 'needs_investigation'
-            state['is_valid_bug'] = True
-        else:
-            state['severity'] = 'medium'
-            state['is_valid_bug'] = True
+        state['severity'] = severity
+        state['is_valid_bug'] = True
         
         state['step_count'] += 1
         return state
 
-    def search_all_sources(state: AgentState) -> dict:
-        state = init_state(state)
-        if not state.get('is_valid_bug', True):
-            return state
-        
-        severity = state.get('severity', 'medium')
-        
-        if severity == 'trivial':
+    def search_update(state: AgentState, results: list) -> dict:
+        if state.get('severity', 'medium') == 'trivial':
             instruction = SystemMessage(
-                content="This is a trivial cosmetic issue (typo). Search ONLY Jira for existing tickets. If duplicate found, reference it. If not, DO NOT create ticket. Summarize as 'low priority' or 'minor' issue."
+                content="This is a trivial cosmetic issue (typo). Jira has already been searched for existing tickets; the results are above. If duplicate found, reference it. If not, DO NOT create ticket. Summarize as 'low priority' or 'minor' issue."
             )
         else:
             instruction = SystemMessage(
-                content="Search Jira, Slack, AND GitHub for related issues. Call jira_search, slack_search, and github_search tools."
+                content="Jira, Slack, AND GitHub have already been searched for related issues; the results are above. Use them to decide whether an existing ticket covers this issue. Only search again if the results are clearly insufficient."
             )
         
         state['step_count'] += 1
-        return {'messages': [instruction]}
+        return {'messages': results + [instruction]}
 
-    def determine_action(state: AgentState) -> dict:
+    def search_all_sources(state: AgentState) -> dict:
         state = init_state(state)
-        messages = state['messages']
-        
-        response_text = " ".join(
-            m.content if hasattr(m, 'content') and m.content else ""
-            for m in messages
+        if not state.get('is_valid_bug', True):
+            return state
+
+        # The searches are always wanted, so run them here in parallel instead
+        # of spending a model round trip asking the LLM to request them.
+        results = search_sources(user_query(state['messages']), state.get('severity', 'medium'))
+        return search_update(state, results)
+
+    async def asearch_all_sources(state: AgentState) -> dict:
+        state = init_state(state)
+        if not state.get('is_valid_bug', True):
+            return state
+        results = await asearch_sources(user_query(state['messages']), state.get('severity', 'medium'))
+        return search_update(state, results)
+
+    def check_duplicate(state: AgentState) -> dict:
+        state = init_state(state)
+        if duplicate_threshold is None or duplicate_threshold > 1:
+            return state
+
+        match = find_duplicate(user_query(state['messages']), get_jira_index(), duplicate_threshold)
+        if match is not None:
+            state['duplicate_found'] = True
+            state['duplicate_ticket_id'] = match[0]['key']
+
+        state['step_count'] += 1
+        return state
+
+    def duplicate_update(state: AgentState, results: list) -> dict:
+        severity = state.get('severity', 'medium')
+        ticket_id = state['duplicate_ticket_id']
+        ticket = get_jira_index().get(ticket_id) or {}
+        summary = AIMessage(
+            content=f"Summary: Found existing Jira ticket {ticket_id} [{ticket.get('priority', 'N/A')}] "
+                    f"[{ticket.get('status', 'Unknown')}]: {ticket.get('summary', '')}. "
+                    f"This report (severity: {severity}) duplicates it, so no new ticket was created."
         )
-        response_lower = response_text.lower()
-        
-        import re
-        ticket_matches = re.findall(r'(CSE-\d+)', response_text, re.IGNORECASE)
+
+        state['summary_done'] = True
+        state['step_count'] += 1
+        return {'messages': results + [summary], 'summary_done': True, 'step_count': state['step_count']}
+
+    def summarize_duplicate(state: AgentState) -> dict:
+        """Cheap path for repeat reports: search as usual, then answer from a template instead of the LLM."""
+        state = init_state(state)
+        results = search_sources(user_query(state['messages']), state.get('severity', 'medium'))
+        return duplicate_update(state, results)
+
+    async def asummarize_duplicate(state: AgentState) -> dict:
+        state = init_state(state)
+        results = await asearch_sources(user_query(state['messages']), state.get('severity', 'medium'))
+        return await run_blocking(duplicate_update, state, results)
+
+    def determine_action(state: AgentState) -> dict:
+        state = init_state(state)
+        track_messages(state)
         
-        if ticket_matches and ('existing' in response_lower or 'found' in response_lower or 'already' in response_lower or 'duplicate' in response_lower):
+        keywords = set(state['keywords_seen'])
+        if state['ticket_ids'] and keywords & {'existing', 'found', 'already', 'duplicate'}:
             state['duplicate_found'] = True
-            state['duplicate_ticket_id'] = ticket_matches[0].upper()
+            state['duplicate_ticket_id'] = state['ticket_ids'][0]
         
         state['step_count'] += 1
         return state
@@ -214,13 +507,7 @@ def create_agent(model: str = None, temperature: float = 0.0, system_prompt: str
                 content="This needs investigation. If existing ticket found, reference it. If clearly a bug with no duplicate, you may create ticket. Otherwise, summarize findings without creating ticket."
             )
         else:
-            priority_map = {
-                'critical': 'P0',
-                'high': 'P1',
-                'medium': 'P2',
-                'minor': 'P3'
-            }
-            priority = priority_map.get(severity, 'P2')
+            priority = PRIORITY_BY_SEVERITY.get(severity, 'P2')
             
             if severity == 'critical':
                 instruction = SystemMessage(
@@ -236,40 +523,24 @@ def create_agent(model: str = None, temperature: float = 0.0, system_prompt: str
 
     def create_final_output(state: AgentState) -> dict:
         state = init_state(state)
-        messages = state['messages']
+        track_messages(state)
         
         output = {
             'status': 'complete' if state['workflow_done'] else 'incomplete',
-            'ticket_id': None,
-            'action_taken': None,
-            'tools_used': [],
-            'summary': None,
+            'ticket_id': state['last_ticket_id'],
+            'action_taken': state['last_action'],
+            'tools_used': list(state['tool_call_log']),
+            'summary': state['last_summary'],
             'steps_taken': state.get('step_count', 0),
-            'retries': state.get('retry_count', 0)
+            'retries': state.get('retry_count', 0),
+            'failed_checks': list(state['failed_checks']),
+            'metrics': metrics_breakdown(state.get('metrics'))
         }
         
-        for m in messages:
-            if hasattr(m, 'content') and m.content:
-                import re
-                match = re.search(r'(CSE-\d+)', m.content, re.IGNORECASE)
-                if match:
-                    output['ticket_id'] = match.group(1).upper()
-                    
-                if 'Created new Jira ticket' in m.content:
-                    output['action_taken'] = 'created_new_ticket'
-                elif 'existing Jira ticket' in m.content.lower():
-                    output['action_taken'] = 'found_duplicate'
-        
-        for m in messages:
-            if hasattr(m, 'tool_calls'):
-                output['tools_used'].extend([tc['name'] for tc in m.tool_calls])
-        
-        for m in reversed(messages):
-            if hasattr(m, 'content') and m.content and len(m.content) > 20:
-                output['summary'] = m.content[:300]
-                break
-        
         state['final_output'] = output
+        exporter = get_exporter()
+        if exporter is not None:
+            exporter.export(output, state.get('severity'))
         return state
 
     workflow = StateGraph(AgentState)
@@ -282,69 +553,48 @@ def create_agent(model: str = None, temperature: float = 0.0, system_prompt: str
             state['needs_retry'] = False
             return state
         
-        messages = state["messages"]
+        track_messages(state)
         severity = state.get('severity', 'medium')
+        tools_called = set(state['tools_called'])
+        keywords = set(state['keywords_seen'])
 
-        # Get full response text for content verification
-        response_text = " ".join(
-            m.content if hasattr(m, 'content') and m.content else ""
-            for m in messages
-        )
-        response_lower = response_text.lower()
-
-        jira_searched = any(
-            hasattr(m, "tool_calls") and any(tc["name"] == "jira_search" for tc in m.tool_calls)
-            for m in messages
-        )
-
-        if severity == 'trivial':
-            slack_searched = True
-        else:
-            slack_searched = any(
-                hasattr(m, "tool_calls") and any(tc["name"] == "slack_search" for tc in m.tool_calls)
-                for m in messages
-            )
+        jira_searched = 'jira_search' in tools_called
+        slack_searched = severity == 'trivial' or 'slack_search' in tools_called
+        github_searched = severity == 'trivial' or 'github_search' in tools_called
 
-        if severity == 'trivial':
-            github_searched = True
-        else:
-            github_searched = any(
-                hasattr(m, "tool_calls") and any(tc["name"] == "github_search" for tc in m.tool_calls)
-                for m in messages
-            )
-
-        ticket_created = any(
-            hasattr(m, "tool_calls") and any(tc["name"] == "jira_create" for tc in m.tool_calls)
-            for m in messages
-        )
-        duplicate_referenced = "existing" in response_lower and "cse-" in response_lower
-        trivial_noted = severity == 'trivial' and ('low priority' in response_lower or 'minor' in response_lower)
+        ticket_created = 'jira_create' in tools_called
+        replies = set(state['reply_keywords'])
+        duplicate_referenced = 'existing' in replies and 'cse-' in replies
+        trivial_noted = severity == 'trivial' and ('low priority' in keywords or 'minor' in keywords)
         
         ticket_ok = ticket_created or duplicate_referenced or trivial_noted
 
-        summary_ok = len(response_text) > 50
+        summary_ok = state['response_chars'] > 50
         
         content_ok = True
         if severity == 'critical':
-            required_words = ['p0', 'critical', 'urgent']
-            content_ok = any(word in response_lower for word in required_words)
+            content_ok = bool(keywords & {'p0', 'critical', 'urgent'})
         elif severity == 'trivial':
             content_ok = not ticket_created
 
 
-        all_checks_passed = all([
-            jira_searched,
-            slack_searched,
-            github_searched,
-            ticket_ok,
-            summary_ok,
-            content_ok
-        ])
+        checks = {
+            'jira_search': jira_searched,
+            'slack_search': slack_searched,
+            'github_search': github_searched,
+            'ticket': ticket_ok,
+            'summary': summary_ok,
+            'content': content_ok,
+        }
+        failed = [name for name, ok in checks.items() if not ok]
+        state['failed_checks'] = failed
+        # A ticket created for a trivial report cannot be taken back, so retrying would not help
+        fixable = [name for name in failed if not (name == 'content' and severity == 'trivial')]
 
-        if all_checks_passed:
+        if not failed:
             state["workflow_done"] = True
             state["needs_retry"] = False
-        elif state["retry_count"] < state["max_retries"]:
+        elif fixable and state["retry_count"] < state["max_retries"]:
             state["needs_retry"] = True
             state["retry_count"] += 1
         else:
@@ -353,24 +603,135 @@ def create_agent(model: str = None, temperature: float = 0.0, system_prompt: str
 
         return state
         
+    def repair_calls(state: AgentState) -> list[tuple[str, dict]]:
+        """The searches verify found missing; only these are safe to run without the model."""
+        failed = set(state['failed_checks'])
+        query = user_query(state['messages'])
+        return [(name, {'query': query}) for name in SEARCH_TOOL_NAMES if name in failed]
+
+    def ticket_prompt(state: AgentState, new_messages: list) -> list | None:
+        """A scoped request for a missing ticket decision: the report, the latest search results and the rule for its severity.
+
+        None unless verify found no ticket for a report above trivial.
+        """
+        severity = state.get('severity', 'medium')
+        if 'ticket' not in state['failed_checks'] or severity == 'trivial':
+            return None
+
+        results = {}
+        for m in state['messages'] + new_messages:
+            if isinstance(m, ToolMessage) and m.name in SEARCH_TOOL_NAMES:
+                results[m.name] = m.content
+        if severity == 'needs_investigation':
+            rule = "If it is clearly a bug with no duplicate, you may create a ticket with jira_create. Otherwise do not create one."
+        else:
+            rule = f"If no existing ticket covers it, create one with jira_create and priority='{PRIORITY_BY_SEVERITY.get(severity, 'P2')}'."
+        calls = _tool_call_requests([(name, {'query': user_query(state['messages'])}) for name in results], f"ticket{state['retry_count']}")
+        return [
+            SystemMessage(content="You decide the Jira ticket for a bug triage from the search results below. If an existing Jira ticket "
+                                  "covers this report, reply 'Found existing ticket [TICKET-ID]' and DO NOT create a new ticket. " + rule),
+            HumanMessage(content=user_query(state['messages'])),
+            AIMessage(content='', tool_calls=calls),
+        ] + [ToolMessage(content=results[tc['name']], name=tc['name'], tool_call_id=tc['id']) for tc in calls]
+
+    def summary_prompt(state: AgentState, new_messages: list) -> list | None:
+        """The small summary request for a missing summary or required wording, or None if neither failed."""
+        failed = set(state['failed_checks'])
+        severity = state.get('severity', 'medium')
+        if not (failed & {'summary', 'content'} or ('ticket' in failed and severity == 'trivial')):
+            return None
+
+        requirements = []
+        if severity == 'critical':
+            requirements.append("State that this is a critical, urgent P0 issue.")
+        if severity == 'trivial':
+            requirements.append("Describe it as a low priority, minor issue and do not propose a new ticket.")
+        results = {}
+        for m in state['messages'] + new_messages:
+            if isinstance(m, ToolMessage):
+                results[m.name] = m.content
+        ticket = results.pop('jira_create', None) or (
+            f"Existing ticket {state['last_ticket_id']}" if state['last_ticket_id'] else "None")
+        digest = "\n\n".join(f"{name}:\n{truncate(content, 600)}" for name, content in results.items())
+        return [
+            SystemMessage(content="You write the final summary of a bug triage. Reply with one short paragraph starting with 'Summary:'. "
+                                  "Mention the ticket ID if there is one. " + " ".join(requirements)),
+            HumanMessage(content=f"Report: {user_query(state['messages'])}\nSeverity: {severity}\nTicket: {ticket}\n\nSearch results:\n{digest}"),
+        ]
+
+    def repair_update(state: AgentState, new_messages: list, response=None) -> dict:
+        if response is not None:
+            if not response.content.startswith('Summary:'):
+                response = AIMessage(content=f"Summary: {response.content}", usage_metadata=response.usage_metadata)
+            new_messages.append(response)
+            state['summary_done'] = True
+
+        state['step_count'] += 1
+        return {'messages': new_messages, 'summary_done': state['summary_done'], 'step_count': state['step_count']}
+
+    def repair(state: AgentState) -> dict:
+        """Fill only the gaps verify found instead of sending the whole conversation back to the model.
+
+        Missing searches are run directly as tool calls. A missing ticket
+        decision is one model call that sees only the report and the search
+        results, and a ticket is created only if the model asks for one. A
+        missing summary or required wording costs one small model call that
+        sees the report and a digest of the results, not the full history.
+        """
+        state = init_state(state)
+        calls = repair_calls(state)
+        new_messages = run_tool_calls(calls, f"repair{state['retry_count']}") if calls else []
+        prompt = ticket_prompt(state, new_messages)
+        if prompt is not None:
+            response = complete(llm, tool_schemas, prompt)
+            # The model's own message is kept, so its tool calls and their results share ids
+            if response.tool_calls or response.content:
+                new_messages += [response] + run_tool_requests(response.tool_calls)
+        prompt = summary_prompt(state, new_messages)
+        response = complete(chat_model, [], prompt) if prompt is not None else None
+        return repair_update(state, new_messages, response)
+
+    async def arepair(state: AgentState) -> dict:
+        state = init_state(state)
+        calls = repair_calls(state)
+        new_messages = await arun_tool_calls(calls, f"repair{state['retry_count']}") if calls else []
+        prompt = ticket_prompt(state, new_messages)
+        if prompt is not None:
+            response = await acomplete(llm, tool_schemas, prompt)
+            if response.tool_calls or response.content:
+                new_messages += [response] + await arun_tool_requests(response.tool_calls)
+        prompt = summary_prompt(state, new_messages)
+        response = await acomplete(chat_model, [], prompt) if prompt is not None else None
+        return repair_update(state, new_messages, response)
+
     def should_retry(state: AgentState) -> str:
         if state.get("needs_retry", False):
-            return "agent"
+            return "repair"
         return "finalize"
         
     def route_after_classify(state: AgentState) -> str:
         if not state.get('is_valid_bug', True):
             return 'finalize'
+        return 'dedupe'
+
+    def route_after_dedupe(state: AgentState) -> str:
+        if state.get('duplicate_found', False):
+            return 'duplicate'
         return 'search'
 
-    workflow.add_node('classify', classify_input)
-    workflow.add_node('search', search_all_sources)
-    workflow.add_node('decide', determine_action)
-    workflow.add_node('execute', execute_action)
-    workflow.add_node('verify', verify)
-    workflow.add_node('finalize', create_final_output)
-    workflow.add_node('agent', call_model)
-    workflow.add_node('tools', tool_node)
+    # Nodes that touch disk or the model have an async form for ainvoke/astream; the rest are cheap enough to run inline
+    offload = lambda fn: lambda state: run_blocking(fn, state)
+    workflow.add_node('classify', timed_node('classify', classify_input))
+    workflow.add_node('dedupe', timed_node('dedupe', check_duplicate, offload(check_duplicate)))
+    workflow.add_node('duplicate', timed_node('duplicate', summarize_duplicate, asummarize_duplicate))
+    workflow.add_node('search', timed_node('search', search_all_sources, asearch_all_sources))
+    workflow.add_node('decide', timed_node('decide', determine_action))
+    workflow.add_node('execute', timed_node('execute', execute_action))
+    workflow.add_node('verify', timed_node('verify', verify))
+    workflow.add_node('finalize', timed_node('finalize', create_final_output, offload(create_final_output)))
+    workflow.add_node('agent', timed_node('agent', call_model, acall_model))
+    workflow.add_node('tools', timed_node('tools', tool_node))
+    workflow.add_node('repair', timed_node('repair', repair, arepair))
 
     workflow.set_entry_point('classify')
 
@@ -378,11 +739,21 @@ def create_agent(model: str = None, temperature: float = 0.0, system_prompt: str
         'classify',
         route_after_classify,
         {
-            'search': 'search',
+            'dedupe': 'dedupe',
             'finalize': 'finalize'
         }
     )
 
+    workflow.add_conditional_edges(
+        'dedupe',
+        route_after_dedupe,
+        {
+            'duplicate': 'duplicate',
+            'search': 'search'
+        }
+    )
+    workflow.add_edge('duplicate', 'verify')
+
     workflow.add_edge('search', 'agent')
     workflow.add_edge('decide', 'agent')
     workflow.add_edge('execute', 'verify')
@@ -391,10 +762,11 @@ def create_agent(model: str = None, temperature: float = 0.0, system_prompt: str
         'verify',
         should_retry,
         {
-            'agent': 'agent',
+            'repair': 'repair',
             'finalize': 'finalize'
         }
     )
+    workflow.add_edge('repair', 'verify')
 
     workflow.add_conditional_edges(
         'agent',
@@ -410,14 +782,223 @@ def create_agent(model: str = None, temperature: float = 0.0, system_prompt: str
 
     compiled = workflow.compile()
     compiled.system_prompt = agent_system_prompt
+    signature = (cache_key, cache_scope, repr(classifier_rules))
+    compiled.run_signature = hashlib.sha256(json.dumps(signature, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+    STARTUP_STATS['agents_built'] += 1
+    STARTUP_STATS['build_ms'] += (time.perf_counter() - build_started) * 1000
+    if cacheable:
+        with _agent_cache_lock:
+            compiled = _agent_cache.setdefault(cache_key, compiled)
     return compiled
 
-agent = create_agent()
-
-def ask_agent(question: str) -> str:
-    state = {'messages':[SystemMessage(content=DEFAULT_SYSTEM_PROMPT), HumanMessage(content=question)]}
-    result = agent.invoke(state)
+def default_response_cache(backend: str = None, temperature: float = 0.0):
+    """The shared response cache for a graph on ``backend``, or None where caching is off.
+
+    It is off at nonzero temperature, with LLM_CACHE=off, while recording
+    (a hit would leave the cassette incomplete) and for the stub backend,
+    whose canned answers must never be served to a real model's runs.
+    """
+    backend = backend or os.getenv('LLM_BACKEND', 'live')
+    if temperature != 0.0 or backend in ('record', 'stub') or os.getenv('LLM_CACHE', 'on') == 'off':
+        return None
+    from setup_agent.llm_cache import get_response_cache
+    return get_response_cache()
+
+def get_agent():
+    """The default triage agent, built on first use."""
+    return create_agent()
+
+def __getattr__(name):
+    # Keeps `from setup_agent.orchestrator import agent` working without building at import time
+    if name == 'agent':
+        return get_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _initial_state(question: str) -> dict:
+    return {'messages':[SystemMessage(content=DEFAULT_SYSTEM_PROMPT), HumanMessage(content=question)]}
+
+def _response(result: dict) -> str:
     for msg in reversed(result['messages']):
         if isinstance(msg, AIMessage) and msg.content:
             return msg.content
     return 'No response generated.'
+
+def _flight_key(agent, question: str) -> tuple:
+    # Runs are only interchangeable on the same graph against the same fixtures
+    return (id(agent), str(fixtures_path()), normalize_query(question))
+
+def _run_store():
+    """The persistent run store configured by RUN_STORE, or None; imported only when configured."""
+    if not os.getenv('RUN_STORE'):
+        return None
+    from setup_agent.run_store import get_run_store
+    return get_run_store()
+
+def _checkpointed(agent, store):
+    with _agent_cache_lock:
+        graph = _checkpointed_agents.get(agent)
+        if graph is None:
+            graph = _checkpointed_agents[agent] = agent.copy(update={'checkpointer': store.checkpointer})
+        return graph
+
+def _thread(thread_id: str) -> dict:
+    return {'configurable': {'thread_id': thread_id}}
+
+def _persisted(agent, question: str):
+    """(store, checkpointed graph, run key) when runs of ``agent`` are persisted, else None."""
+    store = _run_store()
+    if store is None or not hasattr(agent, 'run_signature'):
+        return None
+    return store, _checkpointed(agent, store), store.run_key(agent.run_signature, normalize_query(question), fixtures_path())
+
+def _run_input(question: str, snapshot):
+    """Graph input for a run on a thread whose latest checkpoint is ``snapshot``: None resumes from it."""
+    return None if snapshot is not None and snapshot.values else _initial_state(question)
+
+def _invoke(agent, question: str) -> dict:
+    persisted = _persisted(agent, question)
+    if persisted is None:
+        return agent.invoke(_initial_state(question))
+    store, graph, run_key = persisted
+    thread_id = store.completed(run_key, fixture_version())
+    if thread_id is not None:
+        return graph.get_state(_thread(thread_id)).values
+
+    thread_id, resume = store.begin(run_key)
+    try:
+        snapshot = graph.get_state(_thread(thread_id)) if resume else None
+        if snapshot is not None and snapshot.values and not snapshot.next:
+            result = snapshot.values  # finished, but the process died before recording it
+        else:
+            result = graph.invoke(_run_input(question, snapshot), _thread(thread_id))
+    except BaseException:
+        store.release(thread_id)
+        raise
+    store.finish(run_key, thread_id, fixture_version(), result.get('final_output', {}))
+    return result
+
+async def _ainvoke(agent, question: str) -> dict:
+    persisted = _persisted(agent, question)
+    if persisted is None:
+        return await agent.ainvoke(_initial_state(question))
+    store, graph, run_key = persisted
+    thread_id = await run_blocking(lambda: store.completed(run_key, fixture_version()))
+    if thread_id is not None:
+        return (await graph.aget_state(_thread(thread_id))).values
+
+    thread_id, resume = await run_blocking(store.begin, run_key)
+    try:
+        snapshot = await graph.aget_state(_thread(thread_id)) if resume else None
+        if snapshot is not None and snapshot.values and not snapshot.next:
+            result = snapshot.values
+        else:
+            result = await graph.ainvoke(_run_input(question, snapshot), _thread(thread_id))
+    except BaseException:
+        store.release(thread_id)
+        raise
+    await run_blocking(lambda: store.finish(run_key, thread_id, fixture_version(), result.get('final_output', {})))
+    return result
+
+def run_agent(question: str, agent=None) -> dict:
+    """Final graph state for ``question``; concurrent calls with the same normalized report share one run.
+
+    The shared state is handed to every caller, so it must not be mutated.
+    COALESCE=off runs every call separately.
+
+    With RUN_STORE set, runs are checkpointed to that SQLite file after
+    every step. A report whose last run died part way resumes from its last
+    completed step instead of starting over, and a report that already
+    finished against the current fixture version is answered from the
+    stored run without executing the graph.
+    """
+    agent = agent or get_agent()
+    if not coalescing_enabled():
+        return _invoke(agent, question)
+    return _flights.do(_flight_key(agent, question), lambda: _invoke(agent, question))
+
+async def arun_agent(question: str, agent=None) -> dict:
+    """Async run_agent; coroutines and threads coalesce with each other."""
+    agent = agent or get_agent()
+    if not coalescing_enabled():
+        return await _ainvoke(agent, question)
+    return await _flights.ado(_flight_key(agent, question), lambda: _ainvoke(agent, question))
+
+def coalesce_stats() -> dict:
+    """Runs started (``leaders``), calls that joined one already in flight (``coalesced``) and runs in flight now."""
+    return _flights.stats()
+
+def run_store_stats() -> dict | None:
+    """Runs started, resumed, reused and finished through the RUN_STORE database; None when it is not set."""
+    store = _run_store()
+    return store.stats() if store is not None else None
+
+def ask_agent(question: str) -> str:
+    return _response(run_agent(question))
+
+async def aask_agent(question: str) -> str:
+    """Async ask_agent: awaits the model and sends blocking file work to a bounded pool, so one event loop can run many triages."""
+    return _response(await arun_agent(question))
+
+def triage(question: str, agent=None) -> dict:
+    """Run one report through ``agent`` (default: the shared agent) and return its structured final_output."""
+    return run_agent(question, agent).get('final_output', {})
+
+async def atriage(question: str, agent=None) -> dict:
+    """Async triage."""
+    return (await arun_agent(question, agent)).get('final_output', {})
+
+def stream_agent(question: str):
+    """Triage ``question`` and yield events as they happen instead of blocking on the whole run.
+
+    Events are dicts with a ``type`` of:
+      node         a graph node started (``node``)
+      token        a streamed LLM token (``node``, ``content``)
+      tool_call    a tool was requested (``name``, ``args``)
+      tool_result  a tool returned (``name``, ``content``)
+      message      a complete AI message that was not token-streamed, e.g. a cache hit (``content``)
+      final        the run is over (``final_output``, ``response``)
+    """
+    state = _initial_state(question)
+    emitted_calls = set()
+    final_output, response = {}, None
+
+    def tool_call_events(msg):
+        for tc in msg.tool_calls:
+            if tc['id'] not in emitted_calls:
+                emitted_calls.add(tc['id'])
+                yield {'type': 'tool_call', 'name': tc['name'], 'args': tc['args']}
+
+    for mode, payload in get_agent().stream(state, stream_mode=['tasks', 'messages']):
+        if mode == 'messages':
+            msg, meta = payload
+            if isinstance(msg, AIMessageChunk):
+                if msg.content:
+                    yield {'type': 'token', 'node': meta.get('langgraph_node'), 'content': msg.content}
+            elif isinstance(msg, ToolMessage):
+                yield {'type': 'tool_result', 'name': msg.name, 'content': msg.content}
+            elif isinstance(msg, AIMessage):
+                yield from tool_call_events(msg)
+                if msg.content:
+                    yield {'type': 'message', 'content': msg.content}
+            continue
+
+        if 'input' in payload:
+            yield {'type': 'node', 'node': payload['name']}
+            continue
+        update = payload.get('result') or {}
+        # Nodes whose AI messages can carry the answer, so `response` matches ask_agent's for the same run
+        if payload['name'] in ('agent', 'duplicate', 'repair'):
+            for msg in update.get('messages', []):
+                if not isinstance(msg, AIMessage):
+                    continue
+                yield from tool_call_events(msg)
+                if msg.content:
+                    response = msg.content
+        if update.get('final_output'):
+            final_output = update['final_output']
+
+    yield {'type': 'final', 'final_output': final_output, 'response': response or 'No response generated.'}
+
+STARTUP_STATS['deps_import_ms'] = (_OWN_IMPORT_STARTED - _IMPORT_STARTED) * 1000
+STARTUP_STATS['import_ms'] = (time.perf_counter() - _OWN_IMPORT_STARTED) * 1000
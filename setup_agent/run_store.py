@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Iterator, Sequence
+
+from langgraph.checkpoint.base import WRITES_IDX_MAP, BaseCheckpointSaver, CheckpointTuple, get_checkpoint_id
+
+from setup_agent.mcp_tools import run_blocking
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL DEFAULT '', checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT, type TEXT, checkpoint BLOB, metadata TEXT,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL DEFAULT '', checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL, task_path TEXT NOT NULL DEFAULT '', idx INTEGER NOT NULL, channel TEXT NOT NULL, type TEXT, value BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    thread_id TEXT PRIMARY KEY, run_key TEXT NOT NULL, status TEXT NOT NULL, started REAL NOT NULL, finished REAL
+);
+CREATE INDEX IF NOT EXISTS runs_key ON runs (run_key, status);
+CREATE TABLE IF NOT EXISTS results (
+    run_key TEXT NOT NULL, fixture_version TEXT NOT NULL, thread_id TEXT NOT NULL, final_output TEXT NOT NULL, created REAL NOT NULL,
+    PRIMARY KEY (run_key, fixture_version)
+);
+"""
+
+
+class RunStore:
+    """Checkpoints and finished results of graph runs in one local SQLite database.
+
+    Every run gets a LangGraph thread whose checkpoints are written by
+    ``checkpointer`` as the graph advances, so a run that dies part way can
+    be resumed from its last completed step. Finished runs are recorded
+    under their run key and the fixture version they ended on; while the
+    fixtures stay at that version, the same report is answered from the
+    record. Like SqliteStore, each thread gets its own connection.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._active: set[str] = set()
+        self._lock = threading.Lock()
+        self._stats = {"started": 0, "resumed": 0, "reused": 0, "finished": 0}
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(SCHEMA)
+        self.checkpointer = SqliteCheckpointer(self)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        return conn
+
+    @staticmethod
+    def run_key(signature: str, query: str, fixtures: Path) -> str:
+        """Identity of a run: the agent that does it, the normalized report and the fixture directory it reads."""
+        return hashlib.sha256(f"{signature}\0{query}\0{Path(fixtures).resolve()}".encode()).hexdigest()
+
+    def completed(self, run_key: str, fixture_version: str) -> str | None:
+        """Thread of a finished run for ``run_key`` that ended on ``fixture_version``, if any."""
+        row = self._conn().execute("SELECT thread_id FROM results WHERE run_key = ? AND fixture_version = ?",
+                                   (run_key, fixture_version)).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._stats["reused"] += 1
+        return row[0]
+
+    def begin(self, run_key: str) -> tuple[str, bool]:
+        """Thread to run on and whether it resumes an unfinished run rather than starting fresh."""
+        rows = self._conn().execute("SELECT thread_id FROM runs WHERE run_key = ? AND status = 'running' ORDER BY started DESC",
+                                    (run_key,)).fetchall()
+        with self._lock:
+            for thread_id, in rows:
+                if thread_id not in self._active:
+                    self._active.add(thread_id)
+                    self._stats["resumed"] += 1
+                    return thread_id, True
+            thread_id = uuid.uuid4().hex
+            self._active.add(thread_id)
+            self._stats["started"] += 1
+        self._conn().execute("INSERT INTO runs (thread_id, run_key, status, started) VALUES (?, ?, 'running', ?)",
+                             (thread_id, run_key, time.time()))
+        return thread_id, False
+
+    def release(self, thread_id: str) -> None:
+        """The run on ``thread_id`` stopped without finishing; a later call for the same report may resume it."""
+        with self._lock:
+            self._active.discard(thread_id)
+
+    def finish(self, run_key: str, thread_id: str, fixture_version: str, final_output: dict) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE runs SET status = 'complete', finished = ? WHERE thread_id = ?", (time.time(), thread_id))
+            conn.execute("INSERT OR REPLACE INTO results (run_key, fixture_version, thread_id, final_output, created) VALUES (?, ?, ?, ?, ?)",
+                         (run_key, fixture_version, thread_id, json.dumps(final_output, default=str), time.time()))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self._active.discard(thread_id)
+            self._stats["finished"] += 1
+
+    def final_output(self, run_key: str, fixture_version: str) -> dict | None:
+        row = self._conn().execute("SELECT final_output FROM results WHERE run_key = ? AND fixture_version = ?",
+                                   (run_key, fixture_version)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "active": len(self._active)}
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class SqliteCheckpointer(BaseCheckpointSaver):
+    """LangGraph checkpoint saver over a RunStore's database.
+
+    Checkpoints are stored whole, serialized with the saver's ``serde``;
+    pending writes are kept per task so an interrupted step is replayed
+    exactly. The async methods run the same queries on the fixture I/O pool.
+    """
+
+    def __init__(self, store: RunStore):
+        super().__init__()
+        self.store = store
+
+    @staticmethod
+    def _thread_config(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> dict:
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+    def _tuple(self, conn: sqlite3.Connection, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata = row
+        writes = conn.execute(
+            "SELECT task_id, channel, type, value FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_path, task_id, idx", (thread_id, checkpoint_ns, checkpoint_id)).fetchall()
+        return CheckpointTuple(
+            self._thread_config(thread_id, checkpoint_ns, checkpoint_id),
+            self.serde.loads_typed((type_, checkpoint)),
+            json.loads(metadata) if metadata else {},
+            self._thread_config(thread_id, checkpoint_ns, parent_id) if parent_id else None,
+            [(task_id, channel, self.serde.loads_typed((t, value))) for task_id, channel, t, value in writes],
+        )
+
+    def get_tuple(self, config: dict) -> CheckpointTuple | None:
+        conf = config["configurable"]
+        conn = self.store._conn()
+        columns = "thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata"
+        if checkpoint_id := get_checkpoint_id(config):
+            row = conn.execute(f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                               (str(conf["thread_id"]), conf.get("checkpoint_ns", ""), checkpoint_id)).fetchone()
+        else:
+            row = conn.execute(f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                               (str(conf["thread_id"]), conf.get("checkpoint_ns", ""))).fetchone()
+        return self._tuple(conn, row) if row else None
+
+    def list(self, config: dict | None, *, filter: dict[str, Any] | None = None, before: dict | None = None,
+             limit: int | None = None) -> Iterator[CheckpointTuple]:
+        where, params = [], []
+        if config is not None:
+            conf = config["configurable"]
+            where.append("thread_id = ?")
+            params.append(str(conf["thread_id"]))
+            if conf.get("checkpoint_ns") is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(conf["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None:
+            where.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        conn = self.store._conn()
+        rows = conn.execute("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata "
+                            f"FROM checkpoints {clause} ORDER BY checkpoint_id DESC", params).fetchall()
+        yielded = 0
+        for row in rows:
+            if limit is not None and yielded >= limit:
+                return
+            item = self._tuple(conn, row)
+            if filter and any(item.metadata.get(k) != v for k, v in filter.items()):
+                continue
+            yielded += 1
+            yield item
+
+    def put(self, config: dict, checkpoint: dict, metadata: dict, new_versions: dict) -> dict:
+        conf = config["configurable"]
+        thread_id, checkpoint_ns = str(conf["thread_id"]), conf.get("checkpoint_ns", "")
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        self.store._conn().execute(
+            "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (thread_id, checkpoint_ns, checkpoint["id"], conf.get("checkpoint_id"), type_, blob, json.dumps(metadata, default=str)))
+        return self._thread_config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    def put_writes(self, config: dict, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        conf = config["configurable"]
+        # Special channels (errors, interrupts) replace earlier records; ordinary writes are kept from the first attempt
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        self.store._conn().executemany(
+            f"{verb} INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, task_path, idx, channel, type, value) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(str(conf["thread_id"]), conf.get("checkpoint_ns", ""), str(conf["checkpoint_id"]), task_id, task_path,
+              WRITES_IDX_MAP.get(channel, idx), channel, *self.serde.dumps_typed(value))
+             for idx, (channel, value) in enumerate(writes)])
+
+    def delete_thread(self, thread_id: str) -> None:
+        conn = self.store._conn()
+        conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (str(thread_id),))
+        conn.execute("DELETE FROM writes WHERE thread_id = ?", (str(thread_id),))
+
+    async def aget_tuple(self, config: dict) -> CheckpointTuple | None:
+        return await run_blocking(self.get_tuple, config)
+
+    async def alist(self, config: dict | None, *, filter: dict[str, Any] | None = None, before: dict | None = None,
+                    limit: int | None = None):
+        items = await run_blocking(lambda: [*self.list(config, filter=filter, before=before, limit=limit)])
+        for item in items:
+            yield item
+
+    async def aput(self, config: dict, checkpoint: dict, metadata: dict, new_versions: dict) -> dict:
+        return await run_blocking(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: dict, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        await run_blocking(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await run_blocking(self.delete_thread, thread_id)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_run_store() -> RunStore | None:
+    """Run store at RUN_STORE (a SQLite file path); None when unset."""
+    global _store
+    path = os.getenv("RUN_STORE")
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None or _store.path != Path(path):
+            _store = RunStore(Path(path))
+        return _store
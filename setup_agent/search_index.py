@@ -0,0 +1,177 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Hashable, Iterable
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in",
+    "is", "it", "of", "on", "or", "the", "to", "was", "with",
+})
+
+
+def stem(token: str) -> str:
+    """Very light suffix stripping so 'errors', 'crashed' and 'failing' hit 'error', 'crash', 'fail'."""
+    if len(token) <= 3 or token.isdigit():
+        return token
+    if token.endswith("ies") and len(token) > 4:
+        return token[:-3] + "y"
+    if token.endswith(("sses", "shes", "ches", "xes")):
+        return token[:-2]
+    if token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        token = token[:-1]
+    for suffix in ("ing", "ed"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            if len(token) > 3 and token[-1] == token[-2] and token[-1] not in "lsz":
+                token = token[:-1]
+            break
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    return [stem(t) for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+class InvertedIndex:
+    """Thread-safe in-memory inverted index with BM25 ranking.
+
+    Documents are keyed by a caller-supplied id and carry an arbitrary payload
+    that is handed back from ``search``. Re-adding an id replaces the document.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, dict[Hashable, int]] = {}
+        self._doc_terms: dict[Hashable, Counter] = {}
+        self._doc_len: dict[Hashable, int] = {}
+        self._payloads: dict[Hashable, Any] = {}
+        self._order: dict[Hashable, int] = {}
+        self._total_len = 0
+        self._seq = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self._doc_terms
+
+    def add(self, doc_id: Hashable, text: str, payload: Any = None) -> None:
+        terms = Counter(tokenize(text))
+        with self._lock:
+            if doc_id in self._doc_terms:
+                self._remove(doc_id)
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            self._doc_terms[doc_id] = terms
+            self._doc_len[doc_id] = sum(terms.values())
+            self._payloads[doc_id] = payload
+            self._order[doc_id] = self._seq
+            self._seq += 1
+            self._total_len += self._doc_len[doc_id]
+
+    def add_many(self, docs: Iterable[tuple[Hashable, str, Any]]) -> None:
+        for doc_id, text, payload in docs:
+            self.add(doc_id, text, payload)
+
+    def remove(self, doc_id: Hashable) -> None:
+        with self._lock:
+            if doc_id in self._doc_terms:
+                self._remove(doc_id)
+
+    def _remove(self, doc_id: Hashable) -> None:
+        terms = self._doc_terms.pop(doc_id)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id)
+        del self._payloads[doc_id]
+        del self._order[doc_id]
+
+    def get(self, doc_id: Hashable) -> Any:
+        return self._payloads.get(doc_id)
+
+    def idf(self, term: str) -> float:
+        """BM25 inverse document frequency of an already tokenized term."""
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            df = len(self._postings.get(term, ()))
+            return math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+    def idfs(self, terms) -> dict[str, float]:
+        """idf of each term, under one lock acquisition."""
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            dfs = {term: len(self._postings.get(term, ())) for term in terms}
+        return {term: math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) for term, df in dfs.items()}
+
+    def scores(self, query: str) -> dict[Hashable, float]:
+        """BM25 score of every document that shares at least one term with ``query``."""
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            if not n_docs:
+                return {}
+            avg_len = self._total_len / n_docs or 1.0
+            scores: dict[Hashable, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+            return scores
+
+    def search(self, query: str, k: int = 5) -> list[tuple[Any, float]]:
+        """Return the top ``k`` (payload, score) pairs, best first; ties keep insertion order.
+
+        Terms are scored rarest first. Once the k-th best partial score is
+        beyond what a document could still gain from the remaining terms, no
+        new documents can make the top ``k``, so common terms only update
+        documents already in the running (MaxScore pruning; results are
+        identical to ranking ``scores``).
+        """
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            if not n_docs or k <= 0:
+                return []
+            avg_len = self._total_len / n_docs or 1.0
+            terms = []
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if postings:
+                    df = len(postings)
+                    terms.append((math.log(1 + (n_docs - df + 0.5) / (df + 0.5)), term, postings))
+            terms.sort(key=lambda item: (-item[0], item[1]))
+
+            k1, b, doc_len = self.k1, self.b, self._doc_len
+            # A term adds at most idf * (k1 + 1) to any document's score
+            remaining = sum(idf for idf, _, _ in terms) * (k1 + 1)
+            scores: dict[Hashable, float] = {}
+            for idf, term, postings in terms:
+                open_to_new = len(scores) < k or remaining >= heapq.nlargest(k, scores.values())[-1]
+                remaining -= idf * (k1 + 1)
+                if open_to_new:
+                    docs = postings.items()
+                elif len(scores) < len(postings):
+                    docs = [(doc_id, postings[doc_id]) for doc_id in scores if doc_id in postings]
+                else:
+                    docs = [(doc_id, tf) for doc_id, tf in postings.items() if doc_id in scores]
+                for doc_id, tf in docs:
+                    norm = tf + k1 * (1 - b + b * doc_len[doc_id] / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / norm
+
+            if len(scores) > k:
+                cutoff = heapq.nlargest(k, scores.values())[-1]
+                scores = {doc_id: score for doc_id, score in scores.items() if score >= cutoff}
+            top = sorted(scores.items(), key=lambda item: (-item[1], self._order[item[0]]))[:k]
+            return [(self._payloads[doc_id], score) for doc_id, score in top]
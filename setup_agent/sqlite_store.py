@@ -0,0 +1,309 @@
+import argparse
+import json
+import math
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+from setup_agent.jira_journal import KEY_RE, JiraJournal
+from setup_agent.search_index import STOPWORDS, TOKEN_RE
+
+DB_NAME = "fixtures.sqlite"
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE tickets (id INTEGER PRIMARY KEY, key TEXT UNIQUE, prefix TEXT, num INTEGER, data TEXT NOT NULL);
+CREATE INDEX tickets_prefix_num ON tickets (prefix, num);
+CREATE VIRTUAL TABLE tickets_fts USING fts5 (summary, description, meta, tokenize = 'porter unicode61');
+CREATE TABLE slack_threads (id INTEGER PRIMARY KEY, channel TEXT, first_ts REAL, last_ts REAL, boost REAL, data TEXT NOT NULL);
+CREATE INDEX slack_threads_channel ON slack_threads (channel);
+CREATE VIRTUAL TABLE slack_fts USING fts5 (text, tokenize = 'porter unicode61');
+CREATE TABLE github_issues (id INTEGER PRIMARY KEY, data TEXT NOT NULL);
+CREATE VIRTUAL TABLE github_fts USING fts5 (title, body, tokenize = 'porter unicode61');
+"""
+
+# bm25() column weights for github_fts: (title, body)
+GITHUB_FTS_WEIGHTS = (3.0, 1.0)
+
+
+def match_expression(query: str) -> str | None:
+    """FTS5 MATCH expression OR-ing the query's words, or None if it has none.
+
+    Words are quoted so punctuation and FTS operators in free text can never
+    break the query; stemming is left to the table's porter tokenizer.
+    """
+    words = [w for w in TOKEN_RE.findall(query.lower()) if len(w) > 1 and w not in STOPWORDS]
+    if not words:
+        return None
+    return " OR ".join(f'"{w}"' for w in dict.fromkeys(words))
+
+
+class SqliteStore:
+    """Jira, Slack and GitHub fixtures in one SQLite database with FTS5 indexes.
+
+    Nothing is held in Python memory beyond the rows a query returns; the
+    database pages are shared between worker processes through the OS page
+    cache. Each thread gets its own connection. Ticket creation allocates
+    the next key inside an immediate transaction, so concurrent writers in
+    any process never collide. With ``tickets_path`` set, created tickets
+    are also appended to that Jira fixture's journal, so the JSON fixtures
+    stay the source of truth and a re-import keeps them.
+    """
+
+    def __init__(self, path: Path, prefix: str = "CSE", tickets_path: Path | None = None):
+        self.path = Path(path)
+        self.prefix = prefix
+        self.journal = JiraJournal(tickets_path, prefix=prefix) if tickets_path else None
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if not self.path.exists():
+                raise FileNotFoundError(f"{self.path} does not exist; import the fixtures with `python -m setup_agent.sqlite_store`")
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous = FULL")
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        if self.journal is not None:
+            self.journal.close()
+
+    def count(self, table: str) -> int:
+        """Row count of ``table``, cached per connection until another connection commits (PRAGMA data_version)."""
+        conn = self._conn()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        counts = getattr(self._local, "counts", None)
+        if counts is None or self._local.counts_version != version:
+            counts = self._local.counts = {}
+            self._local.counts_version = version
+        if table not in counts:
+            counts[table] = conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+        return counts[table]
+
+    # Jira
+
+    def search_tickets(self, query: str, k: int) -> list[tuple[dict[str, Any], float]]:
+        expr = match_expression(query)
+        if expr is None:
+            return []
+        # Ranked and cut to k inside the FTS table, so only the winners are joined to their rows
+        rows = self._conn().execute(
+            "SELECT t.data, r.rank FROM (SELECT rowid, rank FROM tickets_fts WHERE tickets_fts MATCH ? ORDER BY rank, rowid LIMIT ?) r "
+            "JOIN tickets t ON t.id = r.rowid ORDER BY r.rank, r.rowid", (expr, k)).fetchall()
+        return [(json.loads(data), -rank) for data, rank in rows]
+
+    def get_ticket(self, key: str) -> dict[str, Any] | None:
+        row = self._conn().execute("SELECT data FROM tickets WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def ticket_frequencies(self, terms: list[str]) -> dict[str, int]:
+        """Number of tickets containing each term, in one query."""
+        if not terms:
+            return {}
+        columns = ", ".join(["(SELECT count(*) FROM tickets_fts WHERE tickets_fts MATCH ?)"] * len(terms))
+        row = self._conn().execute(f"SELECT {columns}", [f'"{term}"' for term in terms]).fetchone()
+        return dict(zip(terms, row))
+
+    def create_ticket(self, fields: dict[str, Any]) -> dict[str, Any]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            num = conn.execute("SELECT coalesce(max(num), 0) + 1 FROM tickets WHERE prefix = ?", (self.prefix,)).fetchone()[0]
+            ticket = {"key": f"{self.prefix}-{num}", **fields}
+            _insert_ticket(conn, ticket)
+            # Journaled while the write lock is held, so journal order matches key order
+            if self.journal is not None:
+                self.journal.append(ticket)
+            conn.execute("COMMIT")
+            # data_version only moves for other connections' commits
+            self._local.counts = None
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return ticket
+
+    # Slack
+
+    def search_threads(self, query: str, channel: str | None = None, start: float | None = None, end: float | None = None,
+                       offset: int = 0, limit: int = 3) -> tuple[list[dict[str, Any]], int]:
+        expr = match_expression(query)
+        where, params = [], []
+        if expr is not None:
+            where.append("slack_fts MATCH ?")
+            params.append(expr)
+        if channel is not None:
+            where.append("t.channel = ?")
+            params.append(channel)
+        if start is not None:
+            where.append("t.last_ts >= ?")
+            params.append(start)
+        if end is not None:
+            where.append("t.first_ts <= ?")
+            params.append(end)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        conn = self._conn()
+        if expr is not None:
+            source = "slack_fts JOIN slack_threads t ON t.id = slack_fts.rowid"
+            order = "bm25(slack_fts) * t.boost, t.id"
+        else:
+            # No searchable words: most recent threads that pass the filters
+            source = "slack_threads t"
+            order = "t.boost DESC, t.id"
+        total = conn.execute(f"SELECT count(*) FROM {source} {clause}", params).fetchone()[0]
+        rows = conn.execute(f"SELECT t.data FROM {source} {clause} ORDER BY {order} LIMIT ? OFFSET ?",
+                            params + [limit, offset]).fetchall()
+        return [json.loads(data) for data, in rows], total
+
+    # GitHub
+
+    def search_issues(self, query: str, k: int) -> list[tuple[dict[str, Any], float]]:
+        expr = match_expression(query)
+        if expr is None:
+            return []
+        rows = self._conn().execute(
+            "SELECT g.data, bm25(github_fts, ?, ?) AS rank FROM github_fts JOIN github_issues g ON g.id = github_fts.rowid "
+            "WHERE github_fts MATCH ? ORDER BY rank, g.id LIMIT ?", (*GITHUB_FTS_WEIGHTS, expr, k)).fetchall()
+        return [(json.loads(data), -rank) for data, rank in rows]
+
+
+class TicketView:
+    """The slice of InvertedIndex that jira_search and dedupe use, answered from SQLite."""
+
+    def __init__(self, store: SqliteStore):
+        self.store = store
+
+    def __len__(self) -> int:
+        return self.store.count("tickets")
+
+    def search(self, query: str, k: int = 5) -> list[tuple[dict[str, Any], float]]:
+        return self.store.search_tickets(query, k)
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        return self.store.get_ticket(key)
+
+    def idf(self, term: str) -> float:
+        return self.idfs([term])[term]
+
+    def idfs(self, terms) -> dict[str, float]:
+        terms = list(dict.fromkeys(terms))
+        n_docs = len(self)
+        return {term: math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) for term, df in self.store.ticket_frequencies(terms).items()}
+
+
+class ThreadView:
+    """SlackIndex's interface, answered from SQLite."""
+
+    def __init__(self, store: SqliteStore):
+        self.store = store
+
+    def __len__(self) -> int:
+        return self.store.count("slack_threads")
+
+    def search(self, query: str, channel: str | None = None, start: float | None = None, end: float | None = None,
+               offset: int = 0, limit: int = 3) -> tuple[list[dict[str, Any]], int]:
+        return self.store.search_threads(query, channel, start, end, offset, limit)
+
+
+class IssueView:
+    """The GitHub index interface (``search``), answered from SQLite."""
+
+    def __init__(self, store: SqliteStore):
+        self.store = store
+
+    def __len__(self) -> int:
+        return self.store.count("github_issues")
+
+    def search(self, query: str, k: int = 5) -> list[tuple[dict[str, Any], float]]:
+        return self.store.search_issues(query, k)
+
+
+def _insert_ticket(conn: sqlite3.Connection, ticket: dict[str, Any]) -> None:
+    m = KEY_RE.match(ticket.get("key") or "")
+    prefix, num = (m.group(1), int(m.group(2))) if m else (None, None)
+    cur = conn.execute("INSERT INTO tickets (key, prefix, num, data) VALUES (?, ?, ?, ?)",
+                       (ticket.get("key"), prefix, num, json.dumps(ticket)))
+    meta = " ".join([ticket.get("status", ""), ticket.get("priority", ""), ticket.get("type", ""), " ".join(ticket.get("labels", []))])
+    conn.execute("INSERT INTO tickets_fts (rowid, summary, description, meta) VALUES (?, ?, ?, ?)",
+                 (cur.lastrowid, ticket.get("summary", ""), ticket.get("description", ""), meta))
+
+
+def _load(path: Path, default: dict) -> dict:
+    if not path.exists():
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+
+def import_fixtures(fixtures_dir: Path, db_path: Path | None = None) -> dict[str, int]:
+    """Build a fresh database from the JSON fixtures (journaled Jira tickets included).
+
+    The database is written next to the fixtures as ``fixtures.sqlite``
+    unless ``db_path`` is given, and swapped in atomically when complete.
+    """
+    from setup_agent.mcp_tools import normalize_channel, parse_ts, recency_boost
+
+    fixtures_dir = Path(fixtures_dir)
+    db_path = Path(db_path) if db_path else fixtures_dir / DB_NAME
+    tmp = db_path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+
+    journal = JiraJournal(fixtures_dir / "jira_tickets.json", durable=False)
+    tickets = journal.tickets()
+    journal.close()
+    threads = _load(fixtures_dir / "slack_messages.json", {"messages": []}).get("messages", [])
+    issues = _load(fixtures_dir / "github_issues.json", {"issues": []}).get("issues", [])
+
+    conn = sqlite3.connect(tmp, isolation_level=None)
+    try:
+        conn.executescript(SCHEMA)
+        conn.execute("BEGIN")
+        for ticket in tickets:
+            _insert_ticket(conn, ticket)
+
+        spans = []
+        for thread in threads:
+            stamps = [ts.timestamp() for ts in (parse_ts(m.get("ts")) for m in thread.get("thread", [])) if ts is not None]
+            spans.append((min(stamps), max(stamps)) if stamps else (None, None))
+        newest = max((last for _, last in spans if last is not None), default=None)
+        for i, (thread, (first, last)) in enumerate(zip(threads, spans)):
+            conn.execute("INSERT INTO slack_threads (id, channel, first_ts, last_ts, boost, data) VALUES (?, ?, ?, ?, ?, ?)",
+                         (i, normalize_channel(thread.get("channel", "")), first, last, recency_boost(last, newest), json.dumps(thread)))
+            conn.execute("INSERT INTO slack_fts (rowid, text) VALUES (?, ?)",
+                         (i, " ".join(m.get("text", "") for m in thread.get("thread", []))))
+
+        for i, issue in enumerate(issues):
+            conn.execute("INSERT INTO github_issues (id, data) VALUES (?, ?)", (i, json.dumps(issue)))
+            conn.execute("INSERT INTO github_fts (rowid, title, body) VALUES (?, ?, ?)", (i, issue.get("title", ""), issue.get("body", "")))
+
+        conn.execute("INSERT INTO meta (key, value) VALUES ('imported_at', strftime('%Y-%m-%dT%H:%M:%f', 'now'))")
+        conn.execute("COMMIT")
+        conn.execute("INSERT INTO tickets_fts (tickets_fts) VALUES ('optimize')")
+        conn.execute("INSERT INTO slack_fts (slack_fts) VALUES ('optimize')")
+        conn.execute("INSERT INTO github_fts (github_fts) VALUES ('optimize')")
+        conn.execute("PRAGMA journal_mode = WAL")
+    finally:
+        conn.close()
+    os.replace(tmp, db_path)
+
+    counts = {"tickets": len(tickets), "slack_threads": len(threads), "github_issues": len(issues)}
+    print(f"Imported {counts['tickets']} Jira tickets, {counts['slack_threads']} Slack threads and {counts['github_issues']} GitHub issues into {db_path}")
+    return counts
+
+
+if __name__ == "__main__":
+    from setup_agent.mcp_tools import FIXTURES_PATH
+
+    parser = argparse.ArgumentParser(description="Import the JSON fixtures into a SQLite FTS5 database")
+    parser.add_argument("fixtures", type=Path, nargs="?", default=FIXTURES_PATH, help="fixture directory to import")
+    parser.add_argument("--db", type=Path, help=f"database path (default <fixtures>/{DB_NAME})")
+    args = parser.parse_args()
+    import_fixtures(args.fixtures, args.db)
@@ -1,8 +1,74 @@
+import argparse
 import json
+import os
+import random
+from collections import deque
+from datetime import datetime, timedelta
 from pathlib import Path
 
 FIXTURES_PATH = Path(__file__).parent / 'mcp_fixtures'
 
+# Vocabulary for the synthetic corpus
+COMPONENTS = {
+    'auth': ('backend', 'Identity'), 'login': ('backend', 'Identity'), 'payment service': ('backend', 'Payments'),
+    'checkout': ('backend', 'Payments'), 'billing': ('backend', 'Payments'), 'search results page': ('frontend', 'Discovery'),
+    'search api': ('backend', 'Discovery'), 'dashboard': ('frontend', 'Insights'), 'reports export': ('backend', 'Insights'),
+    'notification service': ('backend', 'Platform'), 'background worker': ('infra', 'Platform'), 'database': ('infra', 'Platform'),
+    'file upload': ('frontend', 'Core'), 'settings page': ('frontend', 'Core'), 'mobile app': ('mobile', 'Mobile'),
+    'public api': ('backend', 'Core'), 'sso integration': ('backend', 'Identity'), 'email digest': ('backend', 'Platform'),
+}
+SYMPTOMS = [
+    ('crashes on startup', 'P0'), ('returning 500 errors', 'P1'), ('failing intermittently', 'P1'), ('times out under load', 'P1'),
+    ('memory leak', 'P1'), ('complete outage', 'P0'), ('slow response times', 'P2'), ('shows stale data', 'P2'),
+    ('UI glitch', 'P3'), ('misaligned buttons', 'P3'), ('typo in label', 'P3'), ('broken after deploy', 'P1'),
+    ('not working for some users', 'P2'), ('duplicate records created', 'P2'), ('wrong totals displayed', 'P1'),
+]
+CONTEXTS = ['on production', 'in staging', 'after the latest release', 'for EU customers', 'on Safari', 'for enterprise clients',
+            'since the database migration', 'during peak hours', 'on Android', 'when cache is cold', '']
+DETAILS = ['Customers report the issue started this morning.', 'Stack trace points to a null reference in the handler.',
+           'Rollback of the last deploy did not help.', 'Only affects accounts created after March.',
+           'Error rate spiked to 12% according to monitoring.', 'Reproducible with the steps in the attached recording.',
+           'Seems related to the connection pool exhausting.', 'Happens roughly once every hundred requests.',
+           'Support has received several tickets about this.', 'Workaround: refresh the page twice.']
+STATUSES = ['Open', 'Open', 'Open', 'In Progress', 'In Review', 'Resolved', 'Closed']
+TYPES = ['Bug', 'Bug', 'Bug', 'Task', 'Incident']
+PEOPLE = ['alice', 'bob', 'carol', 'dave', 'erin', 'frank', 'grace', 'heidi', 'ivan', 'judy', 'mallory', 'oscar']
+CLIENTS = ['Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark', 'Wayne', None, None, None]
+CHANNELS = ['#bugs', '#incidents', '#support', '#eng-backend', '#eng-frontend', '#releases']
+REPLIES = ['Looking into it now.', 'Same here, seeing it for {client} too.', 'Is there a Jira ticket for this?',
+           'Filed {key} to track it.', 'Logs show timeouts from the {component}.', 'Rolled back, monitoring.',
+           'Still happening after the fix.', 'Can we get a repro?', 'Closing, fixed by the hotfix.', 'Raising to P0, customers are blocked.']
+
+# How many recent summaries to remember when planting duplicates
+DUPLICATE_WINDOW = 2000
+
+# Slack threads and GitHub issues per Jira ticket when only some sizes are given
+SLACK_RATIO = 0.5
+GITHUB_RATIO = 0.25
+
+# setup_agent.sqlite_store.DB_NAME; it is built from these JSON files, so rewriting them makes it stale
+SQLITE_DB_NAME = 'fixtures.sqlite'
+
+def _drop_stale_store(out_dir: Path) -> None:
+    removed = False
+    for suffix in ('', '-wal', '-shm'):
+        path = Path(out_dir) / (SQLITE_DB_NAME + suffix)
+        if path.exists():
+            path.unlink()
+            removed = True
+    if removed:
+        print(f"Removed stale {SQLITE_DB_NAME}; rebuild it with `python -m setup_agent.sqlite_store` to use FIXTURE_BACKEND=sqlite")
+
+def corpus_sizes(jira: int = None, slack_threads: int = None, github: int = None) -> dict:
+    """Fill in unspecified sizes from the given ones at SLACK_RATIO and GITHUB_RATIO to the Jira count."""
+    if jira is None:
+        jira = round(slack_threads / SLACK_RATIO) if slack_threads is not None else round((github or 0) / GITHUB_RATIO)
+    return {
+        'jira': jira,
+        'slack_threads': slack_threads if slack_threads is not None else max(1, int(jira * SLACK_RATIO)),
+        'github': github if github is not None else max(1, int(jira * GITHUB_RATIO)),
+    }
+
 def seed_data():
     FIXTURES_PATH.mkdir(exist_ok=True)
 
@@ -14,6 +80,9 @@ def seed_data():
     }
     with open(FIXTURES_PATH / 'jira_tickets.json', 'w') as f:
         json.dump(jira_mock, f)
+    # Drop tickets journaled by jira_create against the previous snapshot
+    open(FIXTURES_PATH / 'jira_tickets.journal.jsonl', 'w').close()
+    _drop_stale_store(FIXTURES_PATH)
 
     slack_mock = {
         "channels": ["#bugs"],
@@ -37,5 +106,121 @@ def seed_data():
     print("Seeded mock Jira tickets, Slack messages, and GitHub issues")
 
 
+def _write_json_stream(path, prefix: str, items, suffix: str = ']}'):
+    """Write ``prefix`` + comma-separated JSON items + ``suffix`` without holding the items in memory."""
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    count = 0
+    with open(tmp, 'w') as f:
+        f.write(prefix)
+        for item in items:
+            if count:
+                f.write(',\n')
+            f.write(json.dumps(item))
+            count += 1
+        f.write(suffix)
+    os.replace(tmp, path)
+    return count
+
+def _issue_text(rng: random.Random):
+    component = rng.choice(list(COMPONENTS))
+    symptom, priority = rng.choice(SYMPTOMS)
+    context = rng.choice(CONTEXTS)
+    summary = ' '.join(part for part in (component.capitalize(), symptom, context) if part)
+    return component, summary, priority
+
+def _paraphrase(rng: random.Random, summary: str) -> str:
+    prefix = rng.choice(['', 'Again: ', 'Customer reports ', 'Re-opened: ', ''])
+    suffix = rng.choice(['', ' (reported again)', ' - still happening', ''])
+    return f"{prefix}{summary[0].lower() if prefix else summary[0]}{summary[1:]}{suffix}"
+
+def _jira_tickets(rng: random.Random, count: int, duplicate_rate: float):
+    recent = deque(maxlen=DUPLICATE_WINDOW)
+    for n in range(1, count + 1):
+        if recent and rng.random() < duplicate_rate:
+            component, base, priority = rng.choice(recent)
+            summary = _paraphrase(rng, base)
+        else:
+            component, summary, priority = _issue_text(rng)
+            recent.append((component, summary, priority))
+        label, team = COMPONENTS[component]
+        yield {
+            "key": f"CSE-{n}", "summary": summary,
+            "description": ' '.join(rng.sample(DETAILS, rng.randint(1, 3))),
+            "status": rng.choice(STATUSES), "priority": priority, "type": rng.choice(TYPES),
+            "assignee": rng.choice(PEOPLE + [None, None]), "labels": sorted({label, rng.choice(['regression', 'customer', 'sev', label])}),
+            "component": component, "team": team, "client": rng.choice(CLIENTS),
+        }
+
+def _slack_threads(rng: random.Random, count: int, jira_count: int, duplicate_rate: float):
+    start = datetime(2025, 1, 1, 9, 0, 0)
+    recent = deque(maxlen=DUPLICATE_WINDOW)
+    for n in range(count):
+        ts = start + timedelta(minutes=n * rng.uniform(0.5, 3))
+        if recent and rng.random() < duplicate_rate:
+            component, opener = rng.choice(recent)
+            opener = _paraphrase(rng, opener)
+        else:
+            component, opener, _ = _issue_text(rng)
+            recent.append((component, opener))
+        thread = [{"user": rng.choice(PEOPLE), "text": opener, "ts": ts.isoformat(timespec='seconds')}]
+        for _ in range(rng.randint(0, 5)):
+            ts += timedelta(minutes=rng.randint(1, 90))
+            reply = rng.choice(REPLIES).format(client=rng.choice([c for c in CLIENTS if c]), key=f"CSE-{rng.randint(1, max(jira_count, 1))}", component=component)
+            thread.append({"user": rng.choice(PEOPLE), "text": reply, "ts": ts.isoformat(timespec='seconds')})
+        yield {"channel": rng.choice(CHANNELS), "thread": thread}
+
+def _github_issues(rng: random.Random, count: int, duplicate_rate: float):
+    recent = deque(maxlen=DUPLICATE_WINDOW)
+    for n in range(count):
+        if recent and rng.random() < duplicate_rate:
+            title = _paraphrase(rng, rng.choice(recent))
+        else:
+            _, title, _ = _issue_text(rng)
+            recent.append(title)
+        yield {
+            "id": 1000 + n, "title": title,
+            "body": ' '.join(rng.sample(DETAILS, rng.randint(1, 4))),
+            "state": rng.choice(['open', 'open', 'closed']),
+            "labels": rng.sample(['bug', 'regression', 'needs-triage', 'performance', 'ui', 'api'], rng.randint(1, 2)),
+        }
+
+def generate_corpus(jira: int = 1000, slack_threads: int = 1000, github: int = 1000, seed: int = 42,
+                    duplicate_rate: float = 0.15, out_dir: Path = FIXTURES_PATH):
+    """Write a synthetic Jira/Slack/GitHub corpus of the given sizes to ``out_dir``.
+
+    Output is deterministic for a given seed and streamed straight to disk,
+    so corpora of hundreds of thousands of records need no more memory than
+    the small window of recent summaries used to plant near-duplicates.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+
+    counts = {
+        'jira': _write_json_stream(out_dir / 'jira_tickets.json', '{"tickets": [\n', _jira_tickets(rng, jira, duplicate_rate)),
+        'slack': _write_json_stream(out_dir / 'slack_messages.json', json.dumps({"channels": CHANNELS})[:-1] + ', "messages": [\n',
+                                    _slack_threads(rng, slack_threads, jira, duplicate_rate)),
+        'github': _write_json_stream(out_dir / 'github_issues.json', '{"issues": [\n', _github_issues(rng, github, duplicate_rate)),
+    }
+    open(out_dir / 'jira_tickets.journal.jsonl', 'w').close()
+    _drop_stale_store(out_dir)
+
+    print(f"Generated {counts['jira']} Jira tickets, {counts['slack']} Slack threads and {counts['github']} GitHub issues in {out_dir}")
+    return counts
+
+
 if __name__ == "__main__":
-    seed_data()
+    parser = argparse.ArgumentParser(description='Seed mock fixtures; pass any size to generate a synthetic corpus instead')
+    parser.add_argument('--jira', type=int, help='number of Jira tickets')
+    parser.add_argument('--slack-threads', type=int, help='number of Slack threads (default: half the Jira tickets)')
+    parser.add_argument('--github', type=int, help='number of GitHub issues (default: a quarter of the Jira tickets)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed (same seed, same corpus)')
+    parser.add_argument('--duplicate-rate', type=float, default=0.15, help='share of records planted as near-duplicates')
+    parser.add_argument('--out', type=Path, default=FIXTURES_PATH, help='output directory')
+    args = parser.parse_args()
+
+    if args.jira is None and args.slack_threads is None and args.github is None:
+        seed_data()
+    else:
+        generate_corpus(**corpus_sizes(args.jira, args.slack_threads, args.github),
+                        seed=args.seed, duplicate_rate=args.duplicate_rate, out_dir=args.out)
@@ -1,3 +1,4 @@
+import argparse
 import sys
 from pathlib import Path
 
@@ -5,16 +6,18 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from stage_1_golden_sets.evaluator import run_eval
 
-def run_golden_set():
+def run_golden_set(workers: int = 1):
     print("\n" + "="*60)
     print("RUNNING GOLDEN SET EVALUATION")
     print("="*60 + "\n")
     
-    run_eval()
+    run_eval(workers=workers)
     
     print("\n" + "="*60)
     print("GOLDEN SET EVALUATION COMPLETE")
     print("="*60 + "\n")
 
 if __name__ == "__main__":
-    run_golden_set()
+    parser = argparse.ArgumentParser(description="Run the bug triage golden set")
+    parser.add_argument("--workers", type=int, default=1, help="number of test cases to run concurrently")
+    run_golden_set(workers=parser.parse_args().workers)
@@ -0,0 +1,240 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import yaml
+from langchain_core.messages import SystemMessage, HumanMessage
+
+from setup_agent.mcp_tools import jira_search, slack_search, github_search, jira_create, use_fixtures, release_fixtures, fixture_sandbox
+from setup_agent.llm_backend import StubChatModel
+from setup_seed_data.seed_data import corpus_sizes, generate_corpus
+
+ROOT = Path(__file__).parent.parent
+GOLDEN_DATA = ROOT / "stage_1_golden_sets" / "golden_data.yaml"
+DEFAULT_OUTPUT = Path(__file__).parent / "results.json"
+
+SEARCH_TOOLS = [jira_search, slack_search, github_search]
+
+QUERIES = [
+    "Login failure on production",
+    "Payment service failing intermittently",
+    "Minor dashboard UI glitch",
+    "Database memory leak during peak hours",
+    "Checkout returning 500 errors for EU customers",
+]
+
+
+def summarize(samples: list[float]) -> dict:
+    """Latency summary in milliseconds."""
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(ms[len(ms) // 2], 3),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        "min_ms": round(ms[0], 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def traced(fn, *args) -> dict:
+    """Peak and retained Python allocations made by one call, in KiB."""
+    tracemalloc.start()
+    try:
+        fn(*args)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_kib": round(peak / 1024, 1), "retained_kib": round(current / 1024, 1)}
+
+
+def bench_tools(size: int, repeat: int, seed: int) -> dict:
+    """Cold and warm latency plus memory for every tool against a corpus of ``size`` Jira tickets."""
+    with tempfile.TemporaryDirectory(prefix="bench_corpus_") as tmp:
+        counts = generate_corpus(**corpus_sizes(jira=size), seed=seed, out_dir=tmp)
+        result = {"size": size, "corpus": counts, "tools": {}}
+
+        with use_fixtures(tmp):
+            for t in SEARCH_TOOLS:
+                # Cold: first call parses the fixture and builds any index
+                release_fixtures(Path(tmp))
+                cold = timed(t.invoke, {"query": QUERIES[0]})
+                release_fixtures(Path(tmp))
+                memory = traced(t.invoke, {"query": QUERIES[0]})
+
+                samples = [timed(t.invoke, {"query": QUERIES[i % len(QUERIES)]}) for i in range(repeat)]
+                result["tools"][t.name] = {"cold_ms": round(cold * 1000, 3), "warm": summarize(samples), "memory": memory}
+
+            args = {"summary": "Benchmark ticket", "description": "Created by the benchmark suite", "priority": "P2"}
+            samples = [timed(jira_create.invoke, args) for _ in range(repeat)]
+            memory = traced(jira_create.invoke, args)
+            result["tools"][jira_create.name] = {"warm": summarize(samples), "memory": memory}
+
+        release_fixtures(Path(tmp))
+    return result
+
+
+def count_run(agent, state: dict) -> dict:
+    """Run once with node-level streaming to count how often each node executed."""
+    nodes: dict[str, int] = {}
+    final_output = {}
+    for update in agent.stream(state, stream_mode="updates"):
+        for node, payload in update.items():
+            nodes[node] = nodes.get(node, 0) + 1
+            if isinstance(payload, dict) and payload.get("final_output"):
+                final_output = payload["final_output"]
+    return {"nodes": nodes, "node_executions": sum(nodes.values()), "final_output": final_output}
+
+
+def bench_graph(repeat: int, llm_latency: float) -> list[dict]:
+    """End-to-end ``invoke`` latency and step counts per golden case against the stub model."""
+    from setup_agent.orchestrator import create_agent
+
+    stub = StubChatModel(latency=llm_latency)
+    agent = create_agent(chat_model=stub)
+
+    with open(GOLDEN_DATA) as f:
+        cases = yaml.safe_load(f)["test_cases"]
+
+    results = []
+    for case in cases:
+        def new_state():
+            return {"messages": [SystemMessage(content=agent.system_prompt), HumanMessage(content=case["query"])]}
+
+        with fixture_sandbox():
+            calls_before = stub.calls
+            counted = count_run(agent, new_state())
+            llm_calls = stub.calls - calls_before
+
+        samples = []
+        for _ in range(repeat):
+            # Fresh fixtures each run so jira_create from one run does not turn the next into a duplicate
+            with fixture_sandbox():
+                state = new_state()
+                started = time.perf_counter()
+                result = agent.invoke(state)
+                samples.append(time.perf_counter() - started)
+
+        final_output = counted["final_output"]
+        results.append({
+            "id": case["id"],
+            "query": case["query"],
+            "latency": summarize(samples),
+            "nodes": counted["nodes"],
+            "node_executions": counted["node_executions"],
+            "llm_calls": llm_calls,
+            "tool_calls": len(final_output.get("tools_used", [])),
+            "steps_taken": final_output.get("steps_taken"),
+            "retries": final_output.get("retries"),
+            "messages": len(result["messages"]),
+        })
+        print(f"  {case['id']}: p50 {results[-1]['latency']['p50_ms']:.1f} ms, "
+              f"{counted['node_executions']} nodes, {llm_calls} LLM calls")
+    return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def latency_metrics(report: dict) -> dict[str, float]:
+    """Flatten a report to {name: p50 ms} for comparison."""
+    metrics = {}
+    for entry in report.get("tools", []):
+        for name, stats in entry["tools"].items():
+            metrics[f"tools/{entry['size']}/{name}"] = stats["warm"]["p50_ms"]
+    for case in report.get("graph", []):
+        metrics[f"graph/{case['id']}"] = case["latency"]["p50_ms"]
+    return metrics
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Metrics whose p50 got slower than the baseline by more than ``tolerance``."""
+    current, previous = latency_metrics(report), latency_metrics(baseline)
+    regressions = []
+    for name, value in current.items():
+        before = previous.get(name)
+        if before and value > before * (1 + tolerance):
+            regressions.append(f"{name}: {before:.3f} ms -> {value:.3f} ms (+{(value / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def run_benchmarks(sizes: list[int], repeat: int, seed: int, llm_latency: float, skip_graph: bool = False) -> dict:
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "repeat": repeat,
+            "seed": seed,
+            "llm_latency_ms": llm_latency * 1000,
+        },
+        "tools": [],
+        "graph": [],
+    }
+
+    for size in sizes:
+        print(f"Tools @ {size} tickets")
+        entry = bench_tools(size, repeat, seed)
+        for name, stats in entry["tools"].items():
+            print(f"  {name}: p50 {stats['warm']['p50_ms']:.3f} ms, peak {stats['memory']['peak_kib']:.0f} KiB")
+        report["tools"].append(entry)
+
+    if not skip_graph:
+        print("Graph (stub model)")
+        report["graph"] = bench_graph(repeat, llm_latency)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark tool and end-to-end triage latency")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Jira corpus sizes (Slack gets half, GitHub a quarter)")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per tool query and golden case")
+    parser.add_argument("--seed", type=int, default=42, help="corpus seed")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="simulated model latency per stub call")
+    parser.add_argument("--skip-graph", action="store_true", help="only benchmark the tools")
+    parser.add_argument("-o", "--output", type=Path, default=DEFAULT_OUTPUT, help="where to write the JSON report")
+    parser.add_argument("--baseline", type=Path, help="earlier report to compare p50 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p50 slowdown against the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # Cache hits would hide the graph's real cost
+    os.environ["LLM_CACHE"] = "off"
+
+    report = run_benchmarks(args.sizes, args.repeat, args.seed, args.llm_latency_ms / 1000, args.skip_graph)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline")
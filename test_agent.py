@@ -1,17 +1,23 @@
-from setup_agent.orchestrator import DEFAULT_SYSTEM_PROMPT, agent
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from setup_agent.orchestrator import stream_agent
 
-def pretty(msg):
-    name = msg.__class__.__name__
-    content = getattr(msg, "content", "")
-    print(f"\n[{name}]")
-    if content:
-        print(content)
-
-    if hasattr(msg, "tool_calls") and msg.tool_calls:
-        print("TOOL CALLS:")
-        for tc in msg.tool_calls:
-            print(f"  → {tc['name']}({tc['args']})")
+def pretty(event):
+    kind = event["type"]
+    if kind == "token":
+        print(event["content"], end="", flush=True)
+    elif kind == "node":
+        print(f"\n[{event['node']}]")
+    elif kind == "tool_call":
+        print(f"  → {event['name']}({event['args']})")
+    elif kind == "tool_result":
+        print(f"\n[ToolMessage: {event['name']}]")
+        print(event["content"])
+    elif kind == "message":
+        print(f"\n[AIMessage]")
+        print(event["content"])
+    elif kind == "final":
+        print("\n\nFINAL OUTPUT:")
+        for key, value in event["final_output"].items():
+            print(f"  {key}: {value}")
 
 print("Type prompt (empty line to exit)\n")
 
@@ -20,16 +26,7 @@ while True:
     if not q:
         break
 
-    state = {
-        "messages": [
-            SystemMessage(content=DEFAULT_SYSTEM_PROMPT),
-            HumanMessage(content=q),
-        ]
-    }
-
-    result = agent.invoke(state)
-
     print("\n===== EXECUTION TRACE =====")
-    for m in result["messages"]:
-        pretty(m)
+    for event in stream_agent(q):
+        pretty(event)
     print("\n===========================\n")
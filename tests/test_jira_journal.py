@@ -0,0 +1,41 @@
+import json
+import os
+
+import pytest
+
+from setup_agent import jira_journal
+from setup_agent.jira_journal import JiraJournal
+
+
+def _snapshot(path, keys):
+    with open(path, "w") as f:
+        json.dump({"tickets": [{"key": k, "summary": k} for k in keys]}, f)
+
+
+def test_crash_between_snapshot_replace_and_journal_truncate(tmp_path, monkeypatch):
+    snapshot = tmp_path / "jira_tickets.json"
+    _snapshot(snapshot, ["CSE-1", "CSE-2"])
+    journal = JiraJournal(snapshot, durable=False)
+    journal.create({"summary": "third"})
+    journal.create({"summary": "fourth"})
+
+    # The process dies after os.replace wrote the new snapshot but before the journal was truncated
+    def crash(fd, length):
+        raise SystemExit("crash")
+    monkeypatch.setattr(jira_journal.os, "ftruncate", crash)
+    with pytest.raises(SystemExit):
+        journal.compact()
+    journal.close()
+    monkeypatch.undo()
+    assert os.path.getsize(tmp_path / "jira_tickets.journal.jsonl") > 0
+
+    reopened = JiraJournal(snapshot, durable=False)
+    keys = [t["key"] for t in reopened.tickets()]
+    assert keys == ["CSE-1", "CSE-2", "CSE-3", "CSE-4"]
+    assert reopened.create({"summary": "fifth"})["key"] == "CSE-5"
+
+    reopened.compact()
+    with open(snapshot) as f:
+        assert [t["key"] for t in json.load(f)["tickets"]] == ["CSE-1", "CSE-2", "CSE-3", "CSE-4", "CSE-5"]
+    assert os.path.getsize(tmp_path / "jira_tickets.journal.jsonl") == 0
+    reopened.close()
@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import json
+import time
+from http import HTTPStatus
+
+from setup_agent.llm_backend import LimitedChatModel, make_chat_model
+from setup_agent.orchestrator import DEFAULT_MODEL, atriage, coalesce_stats, create_agent, default_response_cache, run_store_stats
+
+DEFAULT_WORKERS = 32
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_LLM_CONCURRENCY = 8
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class TriageService:
+    """Local HTTP front end for the triage graph.
+
+    ``POST /triage`` with ``{"query": "..."}`` queues a report and answers
+    with its ``final_output``. At most ``workers`` reports run at once on
+    the async graph path; up to ``queue_size`` more wait, and beyond that
+    requests get 429 with a Retry-After header instead of piling up. A
+    report that has not finished within ``timeout`` seconds of arriving is
+    cancelled and answered with 504. Identical reports in flight together
+    share one run (see orchestrator.run_agent). ``GET /health`` reports
+    queue depth, request counters, latency, coalescing and the model
+    limiter's stats.
+
+    Every model call goes through a LimitedChatModel, so no more than
+    ``llm_concurrency`` are in flight and, with ``llm_rate`` set, they are
+    paced to that many calls per second (bursts of ``llm_burst``).
+    ``chat_model`` replaces the LLM_BACKEND model, e.g. with a StubChatModel
+    for tests; such runs bypass the shared response cache.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, queue_size: int = DEFAULT_QUEUE_SIZE, timeout: float = DEFAULT_TIMEOUT,
+                 llm_concurrency: int = DEFAULT_LLM_CONCURRENCY, llm_rate: float = 0.0, llm_burst: int = 1,
+                 chat_model=None, backend: str = None, model: str = None):
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.timeout = timeout
+        model = model or DEFAULT_MODEL
+        self.llm = LimitedChatModel(inner=chat_model or make_chat_model(model, 0.0, backend=backend),
+                                    max_concurrent=max(1, llm_concurrency), rate=llm_rate, burst=llm_burst)
+        # The limiter is injected, so the backend's default cache has to be passed along explicitly
+        response_cache = default_response_cache(backend) if chat_model is None else None
+        self.agent = create_agent(model=model, backend=backend, chat_model=self.llm, response_cache=response_cache)
+        self.stats = {'accepted': 0, 'rejected': 0, 'completed': 0, 'failed': 0, 'timed_out': 0}
+        self._latencies = []
+        self._busy = 0
+        self._pending = 0
+        self._started = None
+        self._queue = None
+        self._tasks = []
+        self._server = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8080):
+        """Start the workers and listen on ``host``:``port`` (0 picks a free port); returns the asyncio server."""
+        self._started = time.time()
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def serve_forever(self, host: str = '127.0.0.1', port: int = 8080) -> None:
+        server = await self.start(host, port)
+        try:
+            await server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _worker(self) -> None:
+        while True:
+            query, future = await self._queue.get()
+            try:
+                if future.done():
+                    continue  # timed out while queued
+                self._busy += 1
+                run = asyncio.ensure_future(atriage(query, self.agent))
+                # The waiting request gave up: stop spending model calls on it
+                future.add_done_callback(lambda f, run=run: run.cancel() if f.cancelled() else None)
+                try:
+                    result = await run
+                except asyncio.CancelledError:
+                    # Only a run cancelled because its request gave up is swallowed; the worker's own cancellation (stop) propagates
+                    if not future.cancelled() or asyncio.current_task().cancelling():
+                        raise
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+                finally:
+                    self._busy -= 1
+            finally:
+                self._pending -= 1
+                self._queue.task_done()
+
+    async def triage(self, query: str) -> tuple[HTTPStatus, dict, dict]:
+        """Queue one report and wait for it; returns (status, body, extra headers)."""
+        # Counting running reports too means a burst fills idle workers before anyone is turned away
+        if self._pending >= self.workers + self.queue_size:
+            self.stats['rejected'] += 1
+            retry_after = max(1, round(self._mean_latency() or 1))
+            return HTTPStatus.TOO_MANY_REQUESTS, {'error': 'queue full, retry later'}, {'Retry-After': str(retry_after)}
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending += 1
+        self._queue.put_nowait((query, future))
+        self.stats['accepted'] += 1
+        started = time.perf_counter()
+        try:
+            final_output = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.stats['timed_out'] += 1
+            return HTTPStatus.GATEWAY_TIMEOUT, {'error': f'triage did not finish within {self.timeout:g}s'}, {}
+        except Exception as e:
+            self.stats['failed'] += 1
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f'{type(e).__name__}: {e}'}, {}
+
+        self.stats['completed'] += 1
+        self._latencies.append(time.perf_counter() - started)
+        del self._latencies[:-1000]
+        return HTTPStatus.OK, {'final_output': final_output}, {}
+
+    def _mean_latency(self) -> float | None:
+        return sum(self._latencies) / len(self._latencies) if self._latencies else None
+
+    def health(self) -> dict:
+        latencies = sorted(self._latencies)
+        return {
+            'status': 'ok',
+            'uptime_s': round(time.time() - self._started, 3) if self._started else 0.0,
+            'queue': {'depth': max(0, self._pending - self._busy), 'capacity': self.queue_size},
+            'workers': {'busy': self._busy, 'total': self.workers},
+            'requests': dict(self.stats),
+            'latency_ms': {
+                'mean': round(self._mean_latency() * 1000, 3) if latencies else None,
+                'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 3) if latencies else None,
+            },
+            'coalescing': coalesce_stats(),
+            'runs': run_store_stats(),
+            'llm': self.llm.stats(),
+        }
+
+    async def _route(self, method: str, path: str, body: bytes) -> tuple[HTTPStatus, dict, dict]:
+        if path == '/health':
+            if method != 'GET':
+                return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'use GET'}, {'Allow': 'GET'}
+            return HTTPStatus.OK, self.health(), {}
+        if path == '/triage':
+            if method != 'POST':
+                return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'use POST'}, {'Allow': 'POST'}
+            try:
+                query = json.loads(body or b'{}').get('query')
+            except (ValueError, AttributeError):
+                query = None
+            if not isinstance(query, str) or not query.strip():
+                return HTTPStatus.BAD_REQUEST, {'error': 'body must be JSON with a non-empty "query"'}, {}
+            return await self.triage(query)
+        return HTTPStatus.NOT_FOUND, {'error': f'no route for {path}'}, {}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                method, path, _ = (await reader.readline()).decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length') or 0)
+            except (ValueError, UnicodeDecodeError):
+                status, payload, extra = HTTPStatus.BAD_REQUEST, {'error': 'malformed request'}, {}
+            else:
+                if length > MAX_BODY_BYTES:
+                    status, payload, extra = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': f'body over {MAX_BODY_BYTES} bytes'}, {}
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload, extra = await self._route(method, path.split('?', 1)[0], body)
+
+            data = json.dumps(payload).encode()
+            head = [f'HTTP/1.1 {status.value} {status.phrase}', 'Content-Type: application/json',
+                    f'Content-Length: {len(data)}', 'Connection: close']
+            head += [f'{name}: {value}' for name, value in extra.items()]
+            writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + data)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # client went away
+        finally:
+            writer.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the triage agent over local HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='reports triaged concurrently')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE, help='reports allowed to wait before requests get 429')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='seconds before a request gets 504')
+    parser.add_argument('--llm-concurrency', type=int, default=DEFAULT_LLM_CONCURRENCY, help='model calls in flight at once')
+    parser.add_argument('--llm-rate', type=float, default=0.0, help='model calls per second (0 for no limit)')
+    parser.add_argument('--llm-burst', type=int, default=1, help='model calls allowed at once above --llm-rate')
+    parser.add_argument('--backend', help='LLM backend (default LLM_BACKEND): live, record, replay or stub')
+    args = parser.parse_args()
+
+    service = TriageService(workers=args.workers, queue_size=args.queue_size, timeout=args.timeout,
+                            llm_concurrency=args.llm_concurrency, llm_rate=args.llm_rate, llm_burst=args.llm_burst,
+                            backend=args.backend)
+    print(f"Serving triage on http://{args.host}:{args.port} (POST /triage, GET /health)")
+    try:
+        asyncio.run(service.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass